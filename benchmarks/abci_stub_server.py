@@ -0,0 +1,146 @@
+"""
+Local ABCI stub node serving a synthetic staking validator set, for exercising --abci_transport
+without a real node. JSON-RPC abci_query is served over GET and POST. With grpcio installed the
+staking and upgrade Query services are served over gRPC, next to a
+cosmos.base.tendermint.v1beta1.Service/ABCIQuery that, like a Cosmos SDK node, rejects anything
+but app, custom, p2p and store paths.
+
+Usage: python3 benchmarks/abci_stub_server.py [--validators 500] [--http_port 26657] [--grpc_port 9090]
+Then: python3 main.py --rpc http://127.0.0.1:26657 --abci_transport grpc --grpc 127.0.0.1:9090 ...
+"""
+import os
+import sys
+import json
+import base64
+import asyncio
+import argparse
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.protobuf.cosmos.crypto.secp256k1.keys_pb2 import PubKey as secp256k1_pub_key
+from src.protobuf.cosmos.staking.v1beta1.query_pb2 import QueryValidatorsRequest, QueryValidatorsResponse
+from src.protobuf.cosmos.upgrade.v1beta1.query_pb2 import QueryCurrentPlanResponse
+
+VALIDATORS_PATH = '/cosmos.staking.v1beta1.Query/Validators'
+CURRENT_PLAN_PATH = '/cosmos.upgrade.v1beta1.Query/CurrentPlan'
+# PATHS Service/ABCIQuery OF THE COSMOS SDK ACCEPTS. gRPC METHOD PATHS ARE REJECTED
+ABCI_QUERY_PREFIXES = ('/app', '/custom', '/p2p', '/store')
+
+def generate_validators(count: int) -> QueryValidatorsResponse:
+    response = QueryValidatorsResponse()
+    for index in range(count):
+        validator = response.validators.add(
+            operator_address=f"storyvaloper1{index:038d}",
+            status=3,
+            tokens=str(1024000000000 + index * 1000000),
+            delegator_shares=f"{1024000000000 + index * 1000000}.000000000000000000",
+        )
+        validator.consensus_pubkey.Pack(secp256k1_pub_key(key=b'\x02' + index.to_bytes(32, 'big')), type_url_prefix='/')
+        validator.description.moniker = f"validator-{index}"
+        validator.description.details = "Validator details " * 4
+        validator.commission.commission_rates.rate = "100000000000000000"
+    return response
+
+class AbciStub:
+    def __init__(self, validators: int):
+        self.validators = generate_validators(validators)
+        self.requests = 0
+
+    def query(self, path: str, data: bytes):
+        """Returns (code, log, value) of an ABCI query. Only the staking Validators and upgrade CurrentPlan queries are known."""
+        self.requests += 1
+        if path == VALIDATORS_PATH:
+            return 0, '', self.validators_page(QueryValidatorsRequest.FromString(data)).SerializeToString()
+        if path == CURRENT_PLAN_PATH:
+            return 0, '', QueryCurrentPlanResponse().SerializeToString()
+        return 6, f"unknown query path {path}", b''
+
+    def validators_page(self, request: QueryValidatorsRequest) -> QueryValidatorsResponse:
+        pagination = request.pagination
+        start = int(pagination.key) if pagination.key else pagination.offset
+        limit = pagination.limit or 100
+        validators = self.validators.validators
+
+        page = QueryValidatorsResponse()
+        page.validators.extend(validators[start:start + limit])
+        if start + limit < len(validators):
+            page.pagination.next_key = str(start + limit).encode()
+        if pagination.count_total:
+            page.pagination.total = len(validators)
+        return page
+
+    async def handle_jsonrpc(self, request: web.Request) -> web.Response:
+        payload = json.loads(await request.read())
+        if payload.get('method') != 'abci_query':
+            return web.json_response({"jsonrpc": "2.0", "id": payload.get('id'), "error": {"code": -32601, "message": "Method not found"}})
+        params = payload['params']
+        code, log, value = self.query(params['path'], bytes.fromhex(params['data']))
+        return web.json_response({"jsonrpc": "2.0", "id": payload.get('id'), "result": {"response": {
+            "code": code, "log": log, "info": "", "index": "0", "key": None,
+            "value": base64.b64encode(value).decode(), "proofOps": None, "height": "1", "codespace": ""
+        }}})
+
+    async def start_http(self, host: str, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_route('GET', '/', self.handle_jsonrpc)
+        app.router.add_route('POST', '/', self.handle_jsonrpc)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+    async def start_grpc(self, host: str, port: int):
+        import grpc
+        from src.protobuf.cosmos.base.tendermint.v1beta1.query_pb2 import ABCIQueryResponse
+        from src.protobuf.cosmos.base.tendermint.v1beta1.query_pb2_grpc import ServiceServicer, add_ServiceServicer_to_server
+        from src.protobuf.cosmos.staking.v1beta1 import query_pb2_grpc as staking_grpc
+        from src.protobuf.cosmos.upgrade.v1beta1 import query_pb2_grpc as upgrade_grpc
+
+        stub = self
+
+        class Servicer(ServiceServicer):
+            async def ABCIQuery(self, request, context):
+                if not request.path.startswith(ABCI_QUERY_PREFIXES):
+                    await context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"unsupported ABCI query path {request.path}, only app, custom, p2p and store paths are served")
+                code, log, value = stub.query(request.path, request.data)
+                return ABCIQueryResponse(code=code, log=log, value=value, height=1)
+
+        class StakingServicer(staking_grpc.QueryServicer):
+            async def Validators(self, request, context):
+                stub.requests += 1
+                return stub.validators_page(request)
+
+        class UpgradeServicer(upgrade_grpc.QueryServicer):
+            async def CurrentPlan(self, request, context):
+                stub.requests += 1
+                return QueryCurrentPlanResponse()
+
+        server = grpc.aio.server()
+        add_ServiceServicer_to_server(Servicer(), server)
+        staking_grpc.add_QueryServicer_to_server(StakingServicer(), server)
+        upgrade_grpc.add_QueryServicer_to_server(UpgradeServicer(), server)
+        server.add_insecure_port(f"{host}:{port}")
+        await server.start()
+        return server
+
+async def main(args):
+    stub = AbciStub(args.validators)
+    await stub.start_http(args.host, args.http_port)
+    print(f"JSON-RPC abci_query stub on http://{args.host}:{args.http_port} ({args.validators} validators)")
+    try:
+        await stub.start_grpc(args.host, args.grpc_port)
+        print(f"gRPC Query stub on {args.host}:{args.grpc_port}")
+    except ImportError:
+        print("grpcio is not installed, gRPC stub disabled")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--validators', type=int, default=500)
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--http_port', type=int, default=26657)
+    parser.add_argument('--grpc_port', type=int, default=9090)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
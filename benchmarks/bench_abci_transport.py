@@ -0,0 +1,60 @@
+"""
+Benchmark of a full validator set fetch over each --abci_transport against the local ABCI stub.
+
+Usage: python3 benchmarks/bench_abci_transport.py [--validators 2000] [--repeat 20]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--validators', type=int, default=2000)
+parser.add_argument('--repeat', type=int, default=20)
+parser.add_argument('--http_port', type=int, default=36657)
+parser.add_argument('--grpc_port', type=int, default=39090)
+args = parser.parse_args()
+
+# utils.flags parses the command line on import, src.calls needs it
+sys.argv = sys.argv[:1] + ['--rpc', f'http://127.0.0.1:{args.http_port}', '--grpc', f'127.0.0.1:{args.grpc_port}', '--no_save']
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.flags import flags
+from src.calls import AioHttpCalls
+from abci_stub_server import AbciStub
+
+async def fetch_validators(transport: str) -> float:
+    flags.abci_transport = transport
+    timings = []
+    async with AioHttpCalls() as session:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            validators = await session.get_validators(status='BOND_STATUS_BONDED')
+            timings.append(time.perf_counter() - start)
+            assert validators and len(validators) == args.validators, len(validators or [])
+    return min(timings)
+
+async def main():
+    stub = AbciStub(args.validators)
+    runner = await stub.start_http('127.0.0.1', args.http_port)
+    transports = ['get', 'post']
+    server = None
+    try:
+        server = await stub.start_grpc('127.0.0.1', args.grpc_port)
+        transports.append('grpc')
+    except ImportError:
+        print("grpcio is not installed, skipping grpc transport")
+
+    try:
+        for transport in transports:
+            seconds = await fetch_validators(transport)
+            print(f"{transport.ljust(5)} | {seconds * 1e3:8.2f} ms per {args.validators} validators")
+    finally:
+        await AioHttpCalls.close_shared_session()
+        await runner.cleanup()
+        if server:
+            await server.stop(None)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of consensus pubkey -> consensus hex address conversion for a validator set.
+
+Usage: python3 benchmarks/bench_converter.py [--validators 500] [--repeat 50]
+"""
+import os
+import sys
+import timeit
+import argparse
+from base64 import b64decode, b64encode
+from hashlib import sha256
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Crypto.Hash import RIPEMD160
+from src.converter import pubkey_bytes_to_address, pubkey_to_consensus_hex, pubkeys_to_consensus_hex
+
+def generate_pubkeys(count: int) -> list:
+    # 33 byte compressed secp256k1 keys, as used for Story consensus keys
+    return [b64encode(b'\x02' + os.urandom(32)).decode() for _ in range(count)]
+
+def legacy_pubkey_to_consensus_hex(pub_key):
+    # Conversion used by src/converter.py before memoization
+    pubkey_bytes = b64decode(pub_key)
+    sha256_digest = sha256(pubkey_bytes).digest()
+    ripemd160 = RIPEMD160.new()
+    ripemd160.update(sha256_digest)
+    ripemd160_digest = ripemd160.digest()
+    return ''.join(format(byte, '02x') for byte in ripemd160_digest).upper()
+
+def legacy_convert(pub_keys: list) -> list:
+    return [legacy_pubkey_to_consensus_hex(pub_key) for pub_key in pub_keys]
+
+def cold_convert(pub_keys: list) -> list:
+    pubkey_bytes_to_address.cache_clear()
+    return pubkeys_to_consensus_hex(pub_keys)
+
+def warm_convert(pub_keys: list) -> list:
+    return [pubkey_to_consensus_hex(pub_key) for pub_key in pub_keys]
+
+def warm_list_convert(pub_keys: list) -> list:
+    return pubkeys_to_consensus_hex(pub_keys)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--validators', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    pub_keys = generate_pubkeys(args.validators)
+    assert legacy_convert(pub_keys) == cold_convert(pub_keys) == warm_convert(pub_keys)
+
+    benchmarks = (
+        ('legacy, per validator', legacy_convert),
+        ('cache cleared (first refresh), list', cold_convert),
+        ('cached, per validator', warm_convert),
+        ('cached, list wrapper', warm_list_convert),
+    )
+    for name, func in benchmarks:
+        seconds = min(timeit.repeat(lambda: func(pub_keys), number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name.ljust(38)} | {seconds * 1e3:8.3f} ms per {args.validators} validators")
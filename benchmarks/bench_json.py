@@ -0,0 +1,72 @@
+"""
+Benchmark of JSON decoding of websocket payloads: stdlib json versus src.json_codec.
+
+Uses synthetic NewBlock and Vote events by default. Recorded websocket messages (one JSON
+message per line) can be passed with --file.
+
+Usage: python3 benchmarks/bench_json.py [--validators 100] [--txs 200] [--repeat 200] [--file messages.ndjson]
+"""
+import os
+import sys
+import json
+import base64
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src import json_codec
+
+def random_hex(size: int) -> str:
+    return os.urandom(size).hex().upper()
+
+def generate_vote() -> str:
+    return json.dumps({"jsonrpc": "2.0", "id": 1, "result": {"query": "tm.event='Vote'", "data": {"type": "tendermint/event/Vote", "value": {"Vote": {
+        "type": 2, "height": "814165", "round": 0,
+        "block_id": {"hash": random_hex(32), "parts": {"total": 1, "hash": random_hex(32)}},
+        "timestamp": "2024-11-25T11:42:29.123456789Z", "validator_address": random_hex(20), "validator_index": 12,
+        "signature": base64.b64encode(os.urandom(64)).decode(), "extension": None, "extension_signature": None
+    }}}, "events": {"tm.event": ["Vote"]}}})
+
+def generate_new_block(validators: int, txs: int) -> str:
+    signatures = [{
+        "block_id_flag": 2, "validator_address": random_hex(20),
+        "timestamp": "2024-11-25T11:42:29.123456789Z", "signature": base64.b64encode(os.urandom(64)).decode()
+    } for _ in range(validators)]
+    return json.dumps({"jsonrpc": "2.0", "id": 4, "result": {"query": "tm.event='NewBlock'", "data": {"type": "tendermint/event/NewBlock", "value": {
+        "block": {
+            "header": {"chain_id": "odyssey-0", "height": "814166", "time": "2024-11-25T11:42:30.123456789Z",
+                       "last_block_id": {"hash": random_hex(32)}, "proposer_address": random_hex(20)},
+            "data": {"txs": [base64.b64encode(os.urandom(random.randint(200, 800))).decode() for _ in range(txs)]},
+            "evidence": {"evidence": []},
+            "last_commit": {"height": "814165", "round": 0, "block_id": {"hash": random_hex(32)}, "signatures": signatures}
+        },
+        "result_finalize_block": {"events": [{"type": "commission", "attributes": [{"key": "amount", "value": "1stake", "index": True}] * 4}] * validators}
+    }}, "events": {"tm.event": ["NewBlock"]}}})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--validators', type=int, default=100)
+    parser.add_argument('--txs', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--file', type=str, help='Recorded websocket messages, one per line')
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            payloads = [('recorded', line) for line in f if line.strip()]
+    else:
+        payloads = [('Vote', generate_vote()), ('NewBlock', generate_new_block(args.validators, args.txs))]
+
+    print(f"json_codec backend: {json_codec.BACKEND}")
+    for name, payload in payloads[:10]:
+        assert json.loads(payload) == json_codec.loads(payload)
+        data = json.loads(payload)
+        for label, func in (
+            ('json.loads', lambda: json.loads(payload)),
+            ('json_codec.loads', lambda: json_codec.loads(payload)),
+            ('json.dumps', lambda: json.dumps(data)),
+            ('json_codec.dumpb', lambda: json_codec.dumpb(data)),
+        ):
+            seconds = min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+            print(f"{name.ljust(9)} {len(payload) / 1024:7.1f} KiB | {label.ljust(17)} | {seconds * 1e6:9.1f} us")
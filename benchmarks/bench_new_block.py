@@ -0,0 +1,48 @@
+"""
+Benchmark of NewBlock websocket message decoding: full decode versus src.partial_decoder,
+time and peak memory allocated per message.
+
+Usage: python3 benchmarks/bench_new_block.py [--validators 100] [--txs 200] [--repeat 200]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src import json_codec
+from src.partial_decoder import decode_new_block_event
+from bench_json import generate_new_block
+
+def peak_allocated(func) -> int:
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--validators', type=int, default=100)
+    parser.add_argument('--txs', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    payload = generate_new_block(args.validators, args.txs)
+    full = json.loads(payload)['result']['data']['value']['block']
+    partial = decode_new_block_event(payload)['result']['data']['value']['block']
+    assert partial['last_commit']['signatures'] == full['last_commit']['signatures']
+    assert partial['header']['proposer_address'] == full['header']['proposer_address']
+
+    print(f"NewBlock {len(payload) / 1024:.1f} KiB, {args.validators} signatures, {args.txs} txs (json_codec backend: {json_codec.BACKEND})")
+    for label, func in (
+        ('json.loads', lambda: json.loads(payload)),
+        ('json_codec.loads', lambda: json_codec.loads(payload)),
+        ('decode_new_block_event', lambda: decode_new_block_event(payload)),
+    ):
+        seconds = min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+        print(f"{label.ljust(23)} | {seconds * 1e6:8.1f} us | peak allocated {peak_allocated(func) / 1024:8.1f} KiB")
@@ -0,0 +1,49 @@
+"""
+Startup import-time report built from `python -X importtime`.
+
+Imports each entry module in a fresh interpreter several times and reports the median cumulative
+import time of the module and how much of it is spent in protobuf (generated src.protobuf
+modules plus the google.protobuf runtime).
+
+Usage: python3 benchmarks/bench_startup.py [--runs 7] [--root .] [--modules src.calls main]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PROTOBUF_PREFIXES = ('src.protobuf', 'google.protobuf')
+
+# utils.flags parses the command line on import
+IMPORT_SNIPPET = "import sys; sys.argv = ['main.py', '--rpc', 'http://localhost:26657', '--no_save']; import {module}"
+
+def import_times(module: str, root: str) -> dict:
+    """Returns {module name: (self us, cumulative us)} of one fresh interpreter run."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SNIPPET.format(module=module)],
+        cwd=root, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--root', type=str, default=ROOT, help='Checkout to import from, e.g. a git worktree of an older commit')
+    parser.add_argument('--modules', type=str, nargs='+', default=['src.calls', 'main'])
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals, protobuf = [], []
+        for _ in range(args.runs):
+            times = import_times(module, args.root)
+            totals.append(times[module][1])
+            protobuf.append(sum(self_us for name, (self_us, _) in times.items() if name.startswith(PROTOBUF_PREFIXES)))
+        print(f"{module.ljust(12)} | total {statistics.median(totals) / 1000:7.1f} ms | protobuf {statistics.median(protobuf) / 1000:6.1f} ms")
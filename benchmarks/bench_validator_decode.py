@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of QueryValidatorsResponse decoding: MessageToDict versus direct field access.
+
+Usage: python3 benchmarks/bench_validator_decode.py [--validators 500] [--repeat 20]
+"""
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+parser = argparse.ArgumentParser()
+parser.add_argument('--validators', type=int, default=500)
+parser.add_argument('--repeat', type=int, default=20)
+args = parser.parse_args()
+
+# utils.flags parses the command line on import, src.calls needs it
+sys.argv = sys.argv[:1] + ['--rpc', 'http://localhost:26657', '--no_save']
+from google.protobuf.json_format import MessageToDict
+from src.calls import decode_validator
+from src.protobuf.cosmos.crypto.secp256k1.keys_pb2 import PubKey as secp256k1_pub_key
+from src.protobuf.cosmos.staking.v1beta1.query_pb2 import QueryValidatorsResponse
+
+def generate_response(count: int) -> bytes:
+    response = QueryValidatorsResponse()
+    for index in range(count):
+        validator = response.validators.add(
+            operator_address=f"storyvaloper1{index:038d}",
+            jailed=False,
+            status=3,
+            tokens=str(1024000000000 + index * 1000000),
+            delegator_shares=f"{1024000000000 + index * 1000000}.000000000000000000",
+            min_self_delegation="1024000000000",
+        )
+        validator.consensus_pubkey.Pack(secp256k1_pub_key(key=b'\x02' + os.urandom(32)), type_url_prefix='/')
+        validator.description.moniker = f"validator-{index}"
+        validator.description.website = "https://example.com"
+        validator.description.details = "Validator details " * 4
+        validator.commission.commission_rates.rate = "100000000000000000"
+        validator.commission.commission_rates.max_rate = "200000000000000000"
+        validator.commission.commission_rates.max_change_rate = "10000000000000000"
+    return response.SerializeToString()
+
+def message_to_dict(raw: bytes) -> list:
+    # Decoding used by AioHttpCalls.get_validators before decode_validator
+    query_response = QueryValidatorsResponse()
+    query_response.ParseFromString(raw)
+    return MessageToDict(query_response, preserving_proto_field_name=True)['validators']
+
+def direct(raw: bytes) -> list:
+    query_response = QueryValidatorsResponse()
+    query_response.ParseFromString(raw)
+    return [decode_validator(validator) for validator in query_response.validators]
+
+if __name__ == "__main__":
+    raw = generate_response(args.validators)
+    for full, slim in zip(message_to_dict(raw), direct(raw)):
+        assert full['consensus_pubkey'] == slim['consensus_pubkey']
+        assert full['description']['moniker'] == slim['description']['moniker']
+        assert (full['operator_address'], full['tokens']) == (slim['operator_address'], slim['tokens'])
+
+    benchmarks = (
+        ('MessageToDict', message_to_dict),
+        ('decode_validator', direct),
+    )
+    for name, func in benchmarks:
+        seconds = min(timeit.repeat(lambda: func(raw), number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name.ljust(18)} | {seconds * 1e3:8.3f} ms per {args.validators} validators ({len(raw) / 1024:.0f} KiB response)")
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of /consensus_state vote string parsing.
+
+Usage: python3 benchmarks/bench_vote_parser.py [--votes 1000] [--repeat 200]
+"""
+import os
+import sys
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.vote_parser import parse_votes, parse_vote_blocks
+
+def generate_votes(count: int) -> list:
+    votes = []
+    for index in range(count):
+        if index % 10 == 0:
+            votes.append('nil-Vote')
+            continue
+        votes.append(
+            f"Vote{{{index}:{random.getrandbits(48):012X} 814165/00/SIGNED_MSG_TYPE_PRECOMMIT(Precommit) "
+            f"{random.getrandbits(48):012X} {random.getrandbits(48):012X} 000000000000 @ 2024-11-25T11:42:29.{random.getrandbits(29):09d}Z}}"
+        )
+    return votes
+
+def legacy_parse(votes: list) -> dict:
+    # Parsing used by fetch_monitor.py and dashboard.py before src/vote_parser.py
+    _precommits_hex = {}
+    for precommit in votes:
+        if 'SIGNED_MSG_TYPE_PRECOMMIT(Precommit)' in precommit:
+            commit = precommit.split()[2]
+            hex = precommit.split()[0][-12:]
+            _precommits_hex[hex] = commit
+    return _precommits_hex
+
+def legacy_parse_all_fields(votes: list) -> list:
+    # Same split() approach extended to every field ParsedVote exposes
+    parsed = []
+    for precommit in votes:
+        if 'SIGNED_MSG_TYPE_PRECOMMIT(Precommit)' in precommit:
+            parsed.append((
+                int(precommit.split()[0].split(':')[0][5:]),
+                precommit.split()[0][-12:],
+                'Precommit',
+                precommit.split()[2],
+                precommit.split()[3],
+                precommit.split()[-1][:-1]
+            ))
+    return parsed
+
+def shared_parse_all_fields(votes: list) -> list:
+    return parse_votes(votes)
+
+def shared_parse(votes: list) -> dict:
+    return {vote.address: vote.block_hash for vote in parse_votes(votes) if vote.type == 'Precommit'}
+
+def fast_parse_blocks(votes: list) -> list:
+    return parse_vote_blocks(votes, 'Precommit')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--votes', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    votes = generate_votes(args.votes)
+    assert legacy_parse(votes) == shared_parse(votes)
+    assert legacy_parse_all_fields(votes) == [tuple(vote) for vote in shared_parse_all_fields(votes)]
+    assert fast_parse_blocks(votes) == [(vote.index, vote.block_hash) for vote in parse_votes(votes)]
+
+    benchmarks = (
+        ('legacy split(), address -> hash', legacy_parse),
+        ('src.vote_parser, address -> hash', shared_parse),
+        ('parse_vote_blocks, index -> hash', fast_parse_blocks),
+        ('legacy split(), all fields', legacy_parse_all_fields),
+        ('src.vote_parser, all fields', shared_parse_all_fields),
+    )
+    for name, func in benchmarks:
+        seconds = min(timeit.repeat(lambda: func(votes), number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name.ljust(34)} | {seconds * 1e6 / args.votes * 1000:8.1f} us per 1,000 votes")
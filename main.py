@@ -4,41 +4,69 @@ import signal
 import traceback
 from src.ws_monitor import WsConsensusMonitoring
 from src.fetch_monitor import FetchConsensusMonitoring
-from src.dashboard import ConsensusDashboard
 from src.calls import AioHttpCalls
+from src.archive import ArchiveCompactor
+from src.validator_registry import ValidatorRegistry
 from utils.flags import flags
-from utils.logger import logger
+from utils.logger import logger, stop_logging
 
 
-WS_EVENTS = [
+DASHBOARD_WS_EVENTS = [
     {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='Vote'"], "id": 1},
-    {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='NewRoundStep'"], "id": 2},
-    {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='ValidatorSetUpdates'"], "id": 3},
-    {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='NewBlock'"], "id": 4}
+    {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='NewRoundStep'"], "id": 2}
 ]
+
+def parse_ws_endpoint(rpc):
+    """Builds websocket endpoint from RPC URL."""
+    logger.info(f"Websocket is not provided. Trying to parse from {rpc}")
+    if 'http' in rpc:
+        ws_url = rpc.replace('http', 'ws')
+    elif 'https' in rpc:
+        ws_url = rpc.replace('https', 'wss')
+    else:
+        logger.error(f"Failed to parse ws/wss endpoint from {rpc}. Ensure RPC URL format is correct. Consider providing websocket URL with --ws flag")
+        exit()
+    ws = ws_url + '/websocket'
+    logger.info(f"Using websocket endpoint: {ws}")
+    return ws
+
+def build_ws_events(block_mode):
+    """
+    Subscriptions of the ws monitor. 'full' reads signatures from the NewBlock event (whole block
+    with txs), 'header' subscribes to NewBlockHeader and fetches /commit of the previous height.
+    """
+    block_event = 'NewBlockHeader' if block_mode == 'header' else 'NewBlock'
+    return [
+        {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='Vote'"], "id": 1},
+        {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='NewRoundStep'"], "id": 2},
+        {"jsonrpc": "2.0", "method": "subscribe", "params": ["tm.event='ValidatorSetUpdates'"], "id": 3},
+        {"jsonrpc": "2.0", "method": "subscribe", "params": [f"tm.event='{block_event}'"], "id": 4}
+    ]
 class App:
-    def __init__(self, rpc, ws, ws_events, target_height, post_target_check_blocks_num, save_all, no_save):
+    def __init__(self, rpc, ws, ws_block_mode, target_height, post_target_check_blocks_num, save_all, no_save, votes_journal, votes_journal_flush_interval, votes_flush_grace, storage, sqlite_path, fetch_rate, fetch_fast_rate, fetch_slow_rate, validators_refresh_interval, validators_first_fetch_timeout):
         self.rpc = rpc
         self.ws = ws
-        self.ws_events = ws_events
+        self.ws_block_mode = ws_block_mode
         self.target_height = target_height
         self.post_target_check_blocks_num = post_target_check_blocks_num
         self.save_all = save_all
         self.no_save = no_save
+        self.votes_journal = votes_journal
+        self.votes_journal_flush_interval = votes_journal_flush_interval
+        self.votes_flush_grace = votes_flush_grace
+        self.storage = storage
+        self.sqlite_path = sqlite_path
+        self.fetch_rate = fetch_rate
+        self.fetch_fast_rate = fetch_fast_rate
+        self.fetch_slow_rate = fetch_slow_rate
+        self.validators_refresh_interval = validators_refresh_interval
+        self.validators_first_fetch_timeout = validators_first_fetch_timeout
+        self.validator_registry = None
         self.check_blocks_list = []
 
         # Parse WebSocket URL if not provided
         if not self.ws:
-            logger.info(f"Websocket is not provided. Trying to parse from {self.rpc}")
-            if 'http' in self.rpc:
-                ws_url = self.rpc.replace('http', 'ws')
-            elif 'https' in self.rpc:
-                ws_url = self.rpc.replace('https', 'wss')
-            else:
-                logger.error(f"Failed to parse ws/wss endpoint from {self.rpc}. Ensure RPC URL format is correct. Consider providing websocket URL with --ws flag")
-                exit()
-            self.ws = ws_url + '/websocket'
-            logger.info(f"Using websocket endpoint: {self.ws}")
+            self.ws = [parse_ws_endpoint(rpc) for rpc in self.rpc]
 
         # Generate list of blocks to save signatures post target height
         if self.target_height and self.post_target_check_blocks_num:
@@ -46,14 +74,20 @@ class App:
                 self.check_blocks_list.append(str(int(self.target_height) + i))
 
         asyncio.run(self.check_rpc_connection())
+        self.ws_events = build_ws_events(self.ws_block_mode)
 
     async def check_rpc_connection(self):
         """Checks the RPC connection to ensure it is online."""
         async with AioHttpCalls() as session:
             rpc_status = await session.get_rpc_status()
+            # AUTO MODE: USE NewBlockHeader + /commit IF THE NODE SERVES COMMITS WITH SIGNATURES
+            if rpc_status and self.ws_block_mode == 'auto':
+                commit = await session.get_commit(height=rpc_status['sync_info']['latest_block_height'])
+                self.ws_block_mode = 'header' if commit and commit.get('signatures') is not None else 'full'
+        await AioHttpCalls.close_shared_session()
 
         if not rpc_status:
-            logger.error(f"Failed to connect to {self.rpc}. Ensure the RPC URL format is correct and the node is online.")
+            logger.error(f"Failed to connect to {', '.join(self.rpc)}. Ensure the RPC URL format is correct and the node is online.")
             exit()
 
         catching_up = rpc_status['sync_info']['catching_up']
@@ -63,15 +97,16 @@ class App:
 
         logger.info(f"""
 ---------------------RPC STATUS----------------------
-URL: {self.rpc}
+URL: {', '.join(self.rpc)}
 CHAIN_ID: {chain_id}
 CATCHING_UP: {catching_up}
 LATEST BLOCK: {latest_block_height} | {latest_block_time}
+WS BLOCK MODE: {self.ws_block_mode}
 ------------------------------------------------------
 """)
 
         if catching_up:
-            logger.warning(f"Provided RPC node is catching up. Check {self.rpc}/status. Ignoring.")
+            logger.warning(f"Provided RPC node is catching up. Check {AioHttpCalls.get_endpoint_pool().best.url}/status. Ignoring.")
 
     async def ws_monitor_task(self):
         try:
@@ -81,7 +116,13 @@ LATEST BLOCK: {latest_block_height} | {latest_block_time}
                 target_height=self.target_height,
                 post_target_check_blocks=self.check_blocks_list,
                 save_all=self.save_all,
-                no_save=self.no_save
+                no_save=self.no_save,
+                votes_journal=self.votes_journal,
+                votes_journal_flush_interval=self.votes_journal_flush_interval,
+                votes_flush_grace=self.votes_flush_grace,
+                storage=self.storage,
+                sqlite_path=self.sqlite_path,
+                registry=self.validator_registry
             )
             await ws_monitor.start()
         except asyncio.CancelledError:
@@ -94,18 +135,40 @@ LATEST BLOCK: {latest_block_height} | {latest_block_time}
                 post_target_check_blocks=self.check_blocks_list,
                 save_all=self.save_all,
                 no_save=self.no_save,
-                sleep_time_between=0
+                poll_rate=self.fetch_rate,
+                poll_fast_rate=self.fetch_fast_rate,
+                poll_slow_rate=self.fetch_slow_rate,
+                storage=self.storage,
+                sqlite_path=self.sqlite_path,
+                registry=self.validator_registry
             )
             await fetch_monitor.start()
         except asyncio.CancelledError:
             logger.info("fetch_monitor_task interrupted.")
 
+    async def validator_registry_task(self):
+        try:
+            await self.validator_registry.run_refresher()
+        except asyncio.CancelledError:
+            logger.info("validator_registry_task interrupted.")
+
     def start_app(self):
         """Starts the main application."""
 
+        # ONE PROCESS REFRESHES VALIDATORS, WS AND FETCH MONITORS READ VERSIONED SNAPSHOTS FROM SHARED MEMORY
+        manager = multiprocessing.Manager()
+        self.validator_registry = ValidatorRegistry(
+            shared=manager.dict(),
+            refresh_event=manager.Event(),
+            refresh_interval=self.validators_refresh_interval,
+            first_refresh_timeout=self.validators_first_fetch_timeout
+        )
+
+        registry_process = multiprocessing.Process(target=self.run_in_process, args=(self.validator_registry_task,))
         ws_process = multiprocessing.Process(target=self.run_in_process, args=(self.ws_monitor_task,))
         fetch_process = multiprocessing.Process(target=self.run_in_process, args=(self.fetch_monitor_task,))
 
+        registry_process.start()
         ws_process.start()
         fetch_process.start()
 
@@ -121,6 +184,9 @@ LATEST BLOCK: {latest_block_height} | {latest_block_time}
             ws_process.join()
             fetch_process.join()
         finally:
+            registry_process.terminate()
+            registry_process.join()
+            manager.shutdown()
             logger.info("------------------------------------------------------")
             logger.info("Exiting main process")
 
@@ -141,33 +207,69 @@ LATEST BLOCK: {latest_block_height} | {latest_block_time}
             traceback.print_exc()
         finally:
             logger.info(f"{func.__name__} finished.")
+            # FORKED PROCESSES EXIT WITHOUT atexit, FLUSH QUEUED LOG RECORDS HERE
+            stop_logging()
 
     def signal_handler(self, signum, frame):
         logger.info("------------------------------------------------------")
         logger.info("Signal received: terminating process gracefully...")
         raise KeyboardInterrupt()
 
-async def dashboard(dashboard_refresh_per_second, dashboard_disable_emojis):
+async def dashboard(dashboard_refresh_per_second, dashboard_disable_emojis, dashboard_source, ws):
+    # rich IS ONLY NEEDED BY THE DASHBOARD, KEEP IT OUT OF MONITOR PROCESSES
+    from src.dashboard import ConsensusDashboard
     try:
-        dashboard = ConsensusDashboard(refresh_per_second=dashboard_refresh_per_second, disable_emojis=dashboard_disable_emojis)
+        if dashboard_source == 'ws' and not ws:
+            ws = [parse_ws_endpoint(rpc) for rpc in flags.rpc]
+        dashboard = ConsensusDashboard(
+            refresh_per_second=dashboard_refresh_per_second,
+            disable_emojis=dashboard_disable_emojis,
+            source=dashboard_source,
+            ws=ws,
+            ws_events=DASHBOARD_WS_EVENTS
+        )
         await dashboard.start()
     except asyncio.CancelledError:
         logger.info("Dashboard interrupted.")
 
+def archive(archive_from, archive_to, archive_dir, archive_segment_size):
+    compactor = ArchiveCompactor(archive_dir=archive_dir, segment_size=archive_segment_size)
+    written = compactor.compact(from_height=archive_from, to_height=archive_to)
+    logger.info(f"Archived heights #{archive_from}-#{archive_to} into {len(written)} segment files [{archive_dir}]")
+
 if __name__ == "__main__":
-    if not flags.dashboard_only:
+    if flags.archive_from is not None:
+        archive(
+            archive_from=flags.archive_from,
+            archive_to=flags.archive_to,
+            archive_dir=flags.archive_dir,
+            archive_segment_size=flags.archive_segment_size
+        )
+    elif not flags.dashboard_only:
         app = App(
             rpc=flags.rpc,
             ws=flags.ws,
-            ws_events=WS_EVENTS,
+            ws_block_mode=flags.ws_block_mode,
             target_height=flags.target_height,
             post_target_check_blocks_num=flags.post_target_check_blocks_num,
             save_all=flags.save_all,
             no_save=flags.no_save,
+            votes_journal=not flags.no_votes_journal,
+            votes_journal_flush_interval=flags.votes_journal_flush_interval,
+            votes_flush_grace=flags.votes_flush_grace,
+            storage=flags.storage,
+            sqlite_path=flags.sqlite_path,
+            fetch_rate=flags.fetch_rate,
+            fetch_fast_rate=flags.fetch_fast_rate,
+            fetch_slow_rate=flags.fetch_slow_rate,
+            validators_refresh_interval=flags.validators_refresh_interval,
+            validators_first_fetch_timeout=flags.validators_first_fetch_timeout
         )
         app.start_app()
     else:
         asyncio.run(dashboard(
             dashboard_refresh_per_second = flags.dashboard_refresh_per_second,
-            dashboard_disable_emojis = flags.dashboard_disable_emojis
+            dashboard_disable_emojis = flags.dashboard_disable_emojis,
+            dashboard_source = flags.dashboard_source,
+            ws = flags.ws
         ))
@@ -0,0 +1,233 @@
+import os
+import zlib
+import struct
+import calendar
+from array import array
+from typing import Dict, List, Optional
+from utils.logger import logger
+from src.vote_parser import parse_votes
+from src.validator_registry import ValidatorSnapshot
+from src import json_codec
+
+SEGMENT_MAGIC = b'SCMSEG1\n'
+
+# COLUMN TYPES: 'int' -> int64 array, 'dict' -> dictionary-encoded strings, 'str' -> plain strings
+TABLES = {
+    'votes': {
+        'height': 'int',
+        'round': 'int',
+        'type': 'dict',
+        'validator': 'dict',
+        'moniker': 'dict',
+        'timestamp_ns': 'int',
+        'hash': 'dict',
+        'signature': 'str',
+        'source': 'dict',
+    },
+    'signatures': {
+        'height': 'int',
+        'validator': 'dict',
+        'moniker': 'dict',
+        'signed': 'int',
+        'proposer': 'dict',
+        'timestamp_ns': 'int',
+        'signature': 'str',
+    },
+    'fetch_votes': {
+        'height': 'int',
+        'round': 'int',
+        'type': 'dict',
+        'validator_index': 'int',
+        'validator_prefix': 'dict',
+        'moniker': 'dict',
+        'hash': 'dict',
+        'timestamp_ns': 'int',
+    },
+}
+
+def timestamp_to_ns(timestamp: Optional[str]) -> int:
+    """Converts RFC3339 timestamp with nanoseconds (2024-11-25T11:42:29.123456789Z) to unix nanoseconds. Returns 0 if missing."""
+    if not timestamp or timestamp.startswith('0001-01-01'):
+        return 0
+    seconds = calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                               int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19])))
+    fraction = timestamp[19:].rstrip('Z')
+    nanos = int(fraction[1:].ljust(9, '0')[:9]) if fraction.startswith('.') else 0
+    return seconds * 1_000_000_000 + nanos
+
+def encode_column(values: List, column_type: str) -> dict:
+    if column_type == 'int':
+        return {'data': zlib.compress(array('q', values).tobytes())}
+
+    if column_type == 'dict':
+        dictionary = {}
+        codes = array('i', (dictionary.setdefault(value, len(dictionary)) if value is not None else -1 for value in values))
+        return {
+            'data': zlib.compress(codes.tobytes()),
+            'dictionary': zlib.compress(json_codec.dumpb(list(dictionary)))
+        }
+
+    encoded = [(value or '').encode() for value in values]
+    lengths = array('i', (len(value) for value in encoded))
+    return {
+        'data': zlib.compress(b''.join(encoded)),
+        'lengths': zlib.compress(lengths.tobytes())
+    }
+
+def decode_column(blobs: Dict[str, bytes], column_type: str) -> List:
+    if column_type == 'int':
+        return array('q', zlib.decompress(blobs['data'])).tolist()
+
+    if column_type == 'dict':
+        dictionary = json_codec.loads(zlib.decompress(blobs['dictionary']))
+        return [dictionary[code] if code >= 0 else None for code in array('i', zlib.decompress(blobs['data']))]
+
+    data = zlib.decompress(blobs['data'])
+    values, offset = [], 0
+    for length in array('i', zlib.decompress(blobs['lengths'])):
+        values.append(data[offset:offset + length].decode())
+        offset += length
+    return values
+
+def write_segment(file_path: str, table: str, columns: Dict[str, List]):
+    """
+    Writes a columnar segment file:
+    magic | uint32 header length | JSON header | compressed column blobs.
+    The header stores table name, row count and offset/length of every blob, so readers
+    only decompress the columns they ask for.
+    """
+    header = {'table': table, 'rows': len(next(iter(columns.values()))), 'columns': {}}
+    body, offset = [], 0
+    for name, column_type in TABLES[table].items():
+        header['columns'][name] = {'type': column_type, 'blobs': {}}
+        for blob_name, blob in encode_column(columns[name], column_type).items():
+            header['columns'][name]['blobs'][blob_name] = [offset, len(blob)]
+            body.append(blob)
+            offset += len(blob)
+
+    header_bytes = json_codec.dumpb(header)
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(SEGMENT_MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for blob in body:
+            f.write(blob)
+    os.replace(tmp_path, file_path)
+
+def read_segment(file_path: str, columns: Optional[List[str]] = None) -> Dict[str, List]:
+    """Reads selected (or all) columns of a segment file."""
+    with open(file_path, 'rb') as f:
+        if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+            raise ValueError(f"{file_path} is not a segment file")
+        header_length = struct.unpack('<I', f.read(4))[0]
+        header = json_codec.loads(f.read(header_length))
+        data_start = f.tell()
+
+        result = {}
+        for name in columns or header['columns']:
+            column = header['columns'][name]
+            blobs = {}
+            for blob_name, (offset, length) in column['blobs'].items():
+                f.seek(data_start + offset)
+                blobs[blob_name] = f.read(length)
+            result[name] = decode_column(blobs, column['type'])
+        return result
+
+class ArchiveCompactor:
+    """Turns ranges of result/<height>/*.json files into columnar segment files."""
+
+    def __init__(self, result_dir: str = 'result', archive_dir: str = 'archive', segment_size: int = 1000):
+        self.result_dir = result_dir
+        self.archive_dir = archive_dir
+        self.segment_size = segment_size
+
+    def record_timestamp(self, height: int, file_name: str, timestamp) -> int:
+        """timestamp_to_ns of one record. A malformed timestamp is logged and stored as 0, the rest of the range is still archived."""
+        try:
+            return timestamp_to_ns(timestamp)
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Malformed timestamp {timestamp!r} in {os.path.join(self.result_dir, str(height), file_name)}. Storing 0. {e}")
+            return 0
+
+    def load_json(self, height: int, file_name: str) -> Optional[dict]:
+        file_path = os.path.join(self.result_dir, str(height), file_name)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            try:
+                return json_codec.loads(f.read())
+            except json_codec.JSONDecodeError as e:
+                logger.error(f"Failed to load {file_path} {e}")
+                return None
+
+    def collect_rows(self, from_height: int, to_height: int) -> Dict[str, Dict[str, List]]:
+        tables = {table: {name: [] for name in schema} for table, schema in TABLES.items()}
+        monikers = {}
+
+        for height in range(from_height, to_height + 1):
+            signatures = self.load_json(height, 'ws_signatures.json')
+            if signatures:
+                for signed, key in ((1, 'signed_validators'), (0, 'missed_validators')):
+                    for _hex, validator in signatures.get(key, {}).items():
+                        monikers[_hex] = validator.get('moniker')
+                        signature = validator.get('signature') or {}
+                        rows = tables['signatures']
+                        rows['height'].append(height)
+                        rows['validator'].append(_hex)
+                        rows['moniker'].append(validator.get('moniker'))
+                        rows['signed'].append(signed)
+                        rows['proposer'].append(signatures.get('proposer'))
+                        rows['timestamp_ns'].append(self.record_timestamp(height, 'ws_signatures.json', signature.get('timestamp')))
+                        rows['signature'].append(signature.get('signature'))
+
+            votes = self.load_json(height, 'ws_votes.json')
+            if votes:
+                rows = tables['votes']
+                for _round, vote_types in votes.get('rounds', {}).items():
+                    for _vote_type, validators in vote_types.items():
+                        for _hex, events in validators.items():
+                            for event in events:
+                                rows['height'].append(height)
+                                rows['round'].append(int(_round))
+                                rows['type'].append(_vote_type)
+                                rows['validator'].append(_hex)
+                                rows['moniker'].append(monikers.get(_hex))
+                                rows['timestamp_ns'].append(self.record_timestamp(height, 'ws_votes.json', event.get('timestamp')))
+                                rows['hash'].append(event.get('hash'))
+                                rows['signature'].append(event.get('signature'))
+                                rows['source'].append(event.get('source'))
+
+            consensus = self.load_json(height, 'fetch_votes.json')
+            if consensus:
+                rows = tables['fetch_votes']
+                # VOTE STRINGS ONLY CARRY THE FIRST 12 HEX CHARACTERS OF THE VALIDATOR ADDRESS
+                known_validators = ValidatorSnapshot(0, 0.0, [{'hex': _hex, 'moniker': moniker} for _hex, moniker in monikers.items()])
+                for round_votes in consensus.get('round_state', {}).get('height_vote_set', []):
+                    for key in ('prevotes', 'precommits'):
+                        for vote in parse_votes(round_votes.get(key, [])):
+                            rows['height'].append(height)
+                            rows['round'].append(int(round_votes['round']))
+                            rows['type'].append(vote.type)
+                            rows['validator_index'].append(vote.index)
+                            rows['validator_prefix'].append(vote.address)
+                            rows['moniker'].append((known_validators.get_by_short_hex(vote.address) or {}).get('moniker'))
+                            rows['hash'].append(vote.block_hash)
+                            rows['timestamp_ns'].append(self.record_timestamp(height, 'fetch_votes.json', vote.timestamp))
+
+        return tables
+
+    def compact(self, from_height: int, to_height: int) -> List[str]:
+        """Writes one segment per table for every segment_size heights in the range. Returns written files."""
+        written = []
+        for start in range(from_height, to_height + 1, self.segment_size):
+            end = min(start + self.segment_size - 1, to_height)
+            for table, columns in self.collect_rows(start, end).items():
+                if not columns['height']:
+                    continue
+                file_path = os.path.join(self.archive_dir, f"{table}_{start}_{end}.seg")
+                write_segment(file_path, table, columns)
+                written.append(file_path)
+                logger.info(f"Archived {len(columns['height'])} {table} rows for #{start}-#{end} [{file_path}]")
+        return written
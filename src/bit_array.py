@@ -0,0 +1,116 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+class BitArray:
+    """
+    Fixed size bitset of validator positions backed by a Python int (bit i is validator index i).
+
+    Mirrors tendermint.libs.bits.BitArray: counts, differences between rounds and "who is missing"
+    are single int operations and a round of a few hundred validators fits in a few dozen bytes.
+    """
+    __slots__ = ('size', 'value')
+
+    def __init__(self, size: int, value: int = 0):
+        self.size = size
+        self.value = value & ((1 << size) - 1)
+
+    @classmethod
+    def from_string(cls, bit_array: str) -> 'BitArray':
+        """Parses /consensus_state bit array 'BA{5:xx_x_} 3/5 = 0.60'."""
+        start = bit_array.index(':') + 1
+        bits = bit_array[start:bit_array.index('}', start)]
+        return cls(len(bits), int(bits[::-1].replace('x', '1').replace('_', '0') or '0', 2))
+
+    @classmethod
+    def from_indices(cls, size: int, indices: Iterable[int]) -> 'BitArray':
+        value = 0
+        for index in indices:
+            value |= 1 << index
+        return cls(size, value)
+
+    def set(self, index: int, value: bool = True):
+        if index >= self.size:
+            raise IndexError(f"Bit index {index} out of range for BitArray of size {self.size}")
+        if value:
+            self.value |= 1 << index
+        else:
+            self.value &= ~(1 << index)
+
+    def get(self, index: int) -> bool:
+        return 0 <= index < self.size and bool(self.value >> index & 1)
+
+    def count(self) -> int:
+        return bin(self.value).count('1')
+
+    def fraction(self) -> float:
+        return self.count() / self.size if self.size else 0.0
+
+    def indices(self) -> List[int]:
+        indices = []
+        value = self.value
+        while value:
+            lowest = value & -value
+            indices.append(lowest.bit_length() - 1)
+            value ^= lowest
+        return indices
+
+    def missing(self) -> 'BitArray':
+        """Validators that have not voted."""
+        return BitArray(self.size, ~self.value)
+
+    def __contains__(self, index: int) -> bool:
+        return self.get(index)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __and__(self, other: 'BitArray') -> 'BitArray':
+        return BitArray(max(self.size, other.size), self.value & other.value)
+
+    def __or__(self, other: 'BitArray') -> 'BitArray':
+        return BitArray(max(self.size, other.size), self.value | other.value)
+
+    def __sub__(self, other: 'BitArray') -> 'BitArray':
+        return BitArray(self.size, self.value & ~other.value)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, BitArray) and self.size == other.size and self.value == other.value
+
+    def __repr__(self) -> str:
+        bits = ''.join('x' if self.value >> index & 1 else '_' for index in range(self.size))
+        return f"BA{{{self.size}:{bits}}}"
+
+class VoteSet:
+    """Votes of one round and type: who voted plus a bitset per voted block hash (000000000000 for nil block)."""
+    __slots__ = ('votes', 'blocks')
+
+    def __init__(self, size: int):
+        self.votes = BitArray(size)
+        self.blocks: Dict[str, BitArray] = {}
+
+    @classmethod
+    def from_blocks(cls, size: int, blocks: Iterable[Tuple[int, str]]) -> 'VoteSet':
+        """Builds from src.vote_parser.parse_vote_blocks (validator index, block hash) pairs."""
+        vote_set = cls(size)
+        for index, block_hash in blocks:
+            vote_set.add(index, block_hash)
+        return vote_set
+
+    def add(self, index: int, block_hash: str):
+        self.votes.set(index)
+        if block_hash not in self.blocks:
+            self.blocks[block_hash] = BitArray(self.votes.size)
+        self.blocks[block_hash].set(index)
+
+    def block_of(self, index: int) -> Optional[str]:
+        if index not in self.votes:
+            return None
+        for block_hash, bits in self.blocks.items():
+            if index in bits:
+                return block_hash
+        return None
+
+    def count(self) -> int:
+        return self.votes.count()
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.votes
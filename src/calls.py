@@ -1,64 +1,276 @@
 import aiohttp
+import asyncio
 import traceback
 import base64
-import json
-from typing import Literal
+import re
+import time
+import binascii
+import importlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Literal
 from utils.logger import logger
 from utils.flags import flags
-from src.protobuf.cosmos.base.query.v1beta1.pagination_pb2 import PageRequest
-from src.protobuf.cosmos.staking.v1beta1.query_pb2 import (
-    QueryValidatorsRequest,
-    QueryValidatorsResponse,
-)
-from src.protobuf.cosmos.upgrade.v1beta1.query_pb2 import (
-    QueryCurrentPlanRequest,
-    QueryCurrentPlanResponse,
-)
-
-from google.protobuf.json_format import MessageToDict
-from src.protobuf.cosmos.crypto.ed25519.keys_pb2 import PubKey as ed25519_pub_key
-from src.protobuf.cosmos.crypto.secp256k1.keys_pb2 import PubKey as secp256k1_pub_key
-from src.protobuf.cosmos.crypto.secp256r1.keys_pb2 import PubKey as secp256r1_pub_key
+from src import json_codec
+from src.endpoint_pool import EndpointPool, EndpointStats
+
+if TYPE_CHECKING:
+    from src.protobuf.cosmos.base.query.v1beta1.pagination_pb2 import PageRequest
+
+# GENERATED PROTOBUF MODULES (AND THE DESCRIPTOR POOLS THEY BUILD) ARE IMPORTED ON FIRST USE,
+# NOT WHEN src.calls IS IMPORTED. name -> (module, attribute)
+LAZY_IMPORTS = {
+    'PageRequest': ('src.protobuf.cosmos.base.query.v1beta1.pagination_pb2', 'PageRequest'),
+    'QueryValidatorsRequest': ('src.protobuf.cosmos.staking.v1beta1.query_pb2', 'QueryValidatorsRequest'),
+    'QueryValidatorsResponse': ('src.protobuf.cosmos.staking.v1beta1.query_pb2', 'QueryValidatorsResponse'),
+    'QueryCurrentPlanRequest': ('src.protobuf.cosmos.upgrade.v1beta1.query_pb2', 'QueryCurrentPlanRequest'),
+    'QueryCurrentPlanResponse': ('src.protobuf.cosmos.upgrade.v1beta1.query_pb2', 'QueryCurrentPlanResponse'),
+    'StakingQueryStub': ('src.protobuf.cosmos.staking.v1beta1.query_pb2_grpc', 'QueryStub'),
+    'UpgradeQueryStub': ('src.protobuf.cosmos.upgrade.v1beta1.query_pb2_grpc', 'QueryStub'),
+    'MessageToDict': ('google.protobuf.json_format', 'MessageToDict'),
+    'ed25519_pub_key': ('src.protobuf.cosmos.crypto.ed25519.keys_pb2', 'PubKey'),
+    'secp256k1_pub_key': ('src.protobuf.cosmos.crypto.secp256k1.keys_pb2', 'PubKey'),
+    'secp256r1_pub_key': ('src.protobuf.cosmos.crypto.secp256r1.keys_pb2', 'PubKey'),
+}
+
+@lru_cache(maxsize=None)
+def lazy_import(name: str):
+    module_name, attribute = LAZY_IMPORTS[name]
+    return getattr(importlib.import_module(module_name), attribute)
+
+# Any.type_url -> PubKey message of consensus keys
+PUBKEY_TYPES = {
+    '/cosmos.crypto.ed25519.PubKey': 'ed25519_pub_key',
+    '/cosmos.crypto.secp256k1.PubKey': 'secp256k1_pub_key',
+    '/cosmos.crypto.secp256r1.PubKey': 'secp256r1_pub_key',
+}
+
+# MODULE QUERY PATH -> (gRPC STUB, METHOD, RESPONSE MESSAGE) OF LAZY_IMPORTS. abci_query TAKES THE
+# gRPC METHOD NAME AS PATH, --abci_transport grpc CALLS THE METHOD ON THE STUB
+GRPC_QUERIES = {
+    '/cosmos.staking.v1beta1.Query/Validators': ('StakingQueryStub', 'Validators', 'QueryValidatorsResponse'),
+    '/cosmos.upgrade.v1beta1.Query/CurrentPlan': ('UpgradeQueryStub', 'CurrentPlan', 'QueryCurrentPlanResponse'),
+}
+
+ABCI_VALUE_PATTERN = re.compile(rb'"value"\s*:\s*"')
+
+def decode_abci_response(raw: bytes) -> dict:
+    """
+    Decodes a JSON-RPC abci_query response body into {'code', 'log', 'value': bytes}.
+
+    The base64 value is cut out of the raw body and decoded directly, only the small envelope
+    around it goes through the JSON parser.
+    """
+    value = b''
+    match = ABCI_VALUE_PATTERN.search(raw)
+    if match:
+        start = match.end()
+        end = raw.index(b'"', start)
+        value = binascii.a2b_base64(raw[start:end])
+        raw = raw[:start] + raw[end:]
+    envelope = json_codec.loads(raw)
+    response = envelope.get('result', {}).get('response', {})
+    # -1 KEEPS JSON-RPC ERRORS AND RESPONSES WITHOUT CODE APART FROM AN EMPTY SUCCESSFUL ANSWER
+    return {'code': response.get('code', -1), 'log': response.get('log') or str(envelope.get('error', '')), 'value': value}
+
+def decode_validator(validator) -> dict:
+    """
+    Reads the fields used by the monitors straight from a staking Validator message.
+    Same shape as MessageToDict output, without commission, description details etc.
+    """
+    consensus_pubkey = validator.consensus_pubkey
+    pub_key_type = PUBKEY_TYPES.get(consensus_pubkey.type_url)
+    key = None
+    if pub_key_type:
+        pub_key = lazy_import(pub_key_type)()
+        pub_key.ParseFromString(consensus_pubkey.value)
+        key = base64.b64encode(pub_key.key).decode()
+    return {
+        'operator_address': validator.operator_address,
+        'consensus_pubkey': {'@type': consensus_pubkey.type_url, 'key': key},
+        # PROTOBUF HAS NO MISSING STRINGS, AN UNSET MONIKER DECODES AS ''
+        'description': {'moniker': validator.description.moniker or 'N/A'},
+        'tokens': validator.tokens
+    }
 
 class AioHttpCalls:
+    # ONE KEEP-ALIVE POOLED SESSION PER PROCESS AND EVENT LOOP, SHARED BY ALL INSTANCES
+    shared_session = None
+    shared_session_loop = None
+    # RESPONSE BODY BYTES RECEIVED BY THIS PROCESS (BANDWIDTH ACCOUNTING)
+    received_bytes = 0
+    # SAME FOR THE gRPC CHANNEL OF --abci_transport grpc
+    shared_grpc_channel = None
+    shared_grpc_stubs = {}
+    shared_grpc_loop = None
+    # --rpc ENDPOINTS WITH LATENCY/ERROR STATS OF THIS PROCESS
+    endpoint_pool = None
 
     def __init__(self, timeout = 10):
-        self.rpc = flags.rpc
         self.timeout = timeout
         self.session = None
+        # BODY BYTES RECEIVED BY ALL ENDPOINT ATTEMPTS OF THE LAST RPC CALL OF THIS INSTANCE
+        self.response_bytes = 0
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = await self.get_shared_session()
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await self.session.close()
+        # Session is kept open for the next caller. Use close_shared_session() on shutdown
+        self.session = None
+
+    @classmethod
+    async def get_shared_session(cls) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if cls.shared_session is None or cls.shared_session.closed or cls.shared_session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=flags.rpc_pool_limit,
+                limit_per_host=flags.rpc_pool_limit_per_host,
+                ttl_dns_cache=flags.rpc_dns_cache_ttl,
+                keepalive_timeout=flags.rpc_keepalive_timeout,
+            )
+            cls.shared_session = aiohttp.ClientSession(connector=connector)
+            cls.shared_session_loop = loop
+        return cls.shared_session
+
+    @classmethod
+    async def close_shared_session(cls):
+        if cls.shared_session and not cls.shared_session.closed and cls.shared_session_loop is asyncio.get_running_loop():
+            await cls.shared_session.close()
+        cls.shared_session = None
+        cls.shared_session_loop = None
+        if cls.shared_grpc_channel and cls.shared_grpc_loop is asyncio.get_running_loop():
+            await cls.shared_grpc_channel.close()
+        cls.shared_grpc_channel = None
+        cls.shared_grpc_stubs = {}
+        cls.shared_grpc_loop = None
+
+    @classmethod
+    def get_endpoint_pool(cls) -> EndpointPool:
+        if cls.endpoint_pool is None:
+            cls.endpoint_pool = EndpointPool(urls=flags.rpc, hedge_delay=flags.rpc_hedge_delay)
+        return cls.endpoint_pool
+
+    @classmethod
+    def get_grpc_stub(cls, name: str):
+        """Generated Query stub `name` of LAZY_IMPORTS on a shared grpc.aio channel. Imports grpc lazily."""
+        loop = asyncio.get_running_loop()
+        if cls.shared_grpc_channel is None or cls.shared_grpc_loop is not loop:
+            import grpc
+
+            target = flags.grpc
+            if target.startswith('https://'):
+                channel = grpc.aio.secure_channel(target[len('https://'):], grpc.ssl_channel_credentials())
+            else:
+                channel = grpc.aio.insecure_channel(target.replace('http://', '', 1))
+            cls.shared_grpc_channel = channel
+            cls.shared_grpc_stubs = {}
+            cls.shared_grpc_loop = loop
+        if name not in cls.shared_grpc_stubs:
+            cls.shared_grpc_stubs[name] = lazy_import(name)(cls.shared_grpc_channel)
+        return cls.shared_grpc_stubs[name]
     
-    async def handle_request(self, url, callback):
+    async def timed_request(self, request, endpoint: EndpointStats):
+        """Runs request(rpc_url) on one endpoint. Returns (result, response body bytes)."""
+        pool = self.get_endpoint_pool()
+        started_at = time.monotonic()
+        try:
+            result, size = await request(endpoint.url)
+        except asyncio.CancelledError:
+            # LOSER OF A HEDGED PAIR: ELAPSED TIME IS A LOWER BOUND OF ITS LATENCY. RECORDING IT KEEPS
+            # A SLOW PRIMARY FROM LOOKING FAST JUST BECAUSE ITS REQUESTS NEVER FINISH. IT DID NOT
+            # ANSWER, SO ITS OUTCOME AND ERROR STATE ARE LEFT AS THEY ARE
+            pool.record_latency(endpoint, time.monotonic() - started_at)
+            raise
+        endpoint.received_bytes += size
+        AioHttpCalls.received_bytes += size
+        pool.record(endpoint, time.monotonic() - started_at, ok=result is not None)
+        return result, size
+
+    async def call_endpoints(self, request):
+        """
+        Runs request(rpc_url) on the ranked endpoints, moving to the next one whenever a request
+        fails, until one succeeds or all failed. With --rpc_hedge the second endpoint also gets a
+        duplicate if the first one does not answer within its p95 latency, the first successful
+        result of the pair wins and the other request is cancelled. self.response_bytes is set to
+        the body bytes received by all attempts of the call.
+        """
+        endpoints = self.get_endpoint_pool().ranked()
+        self.response_bytes = 0
+        pending = {asyncio.create_task(self.timed_request(request, endpoints[0]))}
+        next_index = 1
+        try:
+            if flags.rpc_hedge and len(endpoints) > 1:
+                done, _ = await asyncio.wait(pending, timeout=self.get_endpoint_pool().hedge_delay(endpoints[0]))
+                if not done:
+                    pending.add(asyncio.create_task(self.timed_request(request, endpoints[1])))
+                    next_index = 2
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result, size = task.result()
+                    self.response_bytes += size
+                    if result is not None:
+                        return result
+                if not pending and next_index < len(endpoints):
+                    pending.add(asyncio.create_task(self.timed_request(request, endpoints[next_index])))
+                    next_index += 1
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def handle_request(self, path, callback):
+        return await self.call_endpoints(lambda rpc: self.request_endpoint(f"{rpc}{path}", callback))
+
+    async def request_endpoint(self, url, callback):
+        """GET request to url. Returns (callback result or None, response body bytes)."""
+        size = 0
         try:
             async with self.session.get(url, timeout=self.timeout) as response:
                 
                 if response.status == 200:
-                    return await callback(response.json())
+                    body = await response.read()
+                    size = len(body)
+                    return await callback(self.decode_json(body)), size
                 else:
                     logger.error(f"Request to {url} failed with status code {response.status}")
-                    return None
+                    return None, size
                 
         except aiohttp.ClientError as e:
             logger.error(f"Issue with making request to {url}: {e}")
-            return None
+            return None, size
         
         except TimeoutError as e:
             logger.error(f"Issue with making request to {url}. TimeoutError: {e}")
-            return None
+            return None, size
 
         except Exception as e:
             logger.error(f"An unexpected error occurred while making request t {url}: {e}")
             traceback.print_exc()
-            return None
+            return None, size
 
 
-    async def handle_abci_request(self, callback, hex_data, path, prove=False) -> bytes:
+    @staticmethod
+    async def decode_json(body: bytes):
+        return json_codec.loads(body)
+
+    async def handle_abci_request(self, callback, query, path, prove=False):
+        """
+        Sends a module query message and calls callback with the decoded response message. Over
+        JSON-RPC it is an abci_query with the gRPC method name as path. --abci_transport grpc calls
+        the generated Query stub of the module instead, the node's Service/ABCIQuery only serves
+        app, custom, p2p and store paths.
+        """
+        if flags.abci_transport == 'grpc':
+            return await self.handle_grpc_query(callback=callback, query=query, path=path)
+        hex_data = query.SerializeToString().hex()
+        return await self.call_endpoints(lambda rpc: self.abci_request_endpoint(rpc, callback=callback, hex_data=hex_data, path=path, prove=prove))
+
+    async def abci_request_endpoint(self, rpc, callback, hex_data, path, prove=False):
+        """abci_query JSON-RPC request to rpc. Returns (callback result or None, response body bytes)."""
+        size = 0
         try:
             payload = {
                 "jsonrpc": "2.0",
@@ -72,40 +284,70 @@ class AioHttpCalls:
             }
             headers = {"Content-Type": "application/json", "Accept": "application/json"}
 
-            async with self.session.get(self.rpc, timeout=self.timeout, headers=headers, data=json.dumps(payload)) as response:
+            # JSON-RPC BODY IN A GET REQUEST IS KEPT AS DEFAULT FOR NODES BEHIND PROXIES THAT ONLY ALLOW GET
+            method = self.session.post if flags.abci_transport == 'post' else self.session.get
+            async with method(rpc, timeout=self.timeout, headers=headers, data=json_codec.dumpb(payload)) as response:
                     
                 if response.status == 200:
-                    response_json = await response.json()
+                    body = await response.read()
+                    size = len(body)
+                    abci_response = decode_abci_response(body)
 
-                    code = response_json.get('result', {}).get('response', {}).get('code', -1)
-                    abci_error_log = response_json.get('result', {}).get('response', {}).get('log', '')
+                    code = abci_response['code']
+                    abci_error_log = abci_response['log']
                     
                     if code == 0:
-                        response_value = response_json.get('result', {}).get('response', {}).get('value', '')
+                        response_value = abci_response['value']
                         if response_value:
-                            return await callback(base64.b64decode(response_value))
+                            query_response = lazy_import(GRPC_QUERIES[path][2])()
+                            query_response.ParseFromString(response_value)
+                            return await callback(query_response), size
                         else:
                             logger.error(f"ABCI returned 0 code, but with empty response [{payload}]")
                     else:
                         logger.error(f"ABCI retuned {code} code. Payload: {payload}. ABCI log: {abci_error_log}")
+                    return None, size
                 else:
-                    logger.error(f"Request to {self.rpc} failed with status code {response.status}. Payload: {payload}")
-                    return None
+                    logger.error(f"Request to {rpc} failed with status code {response.status}. Payload: {payload}")
+                    return None, size
                 
         except aiohttp.ClientError as e:
-            logger.error(f"Issue with making request to {self.rpc}. Payload: {payload}. {e}")
-            return None
+            logger.error(f"Issue with making request to {rpc}. Payload: {payload}. {e}")
+            return None, size
         
         except TimeoutError as e:
-            logger.error(f"Issue with making request to {self.rpc}. Payload: {payload}. TimeoutError: {e}")
+            logger.error(f"Issue with making request to {rpc}. Payload: {payload}. TimeoutError: {e}")
+            return None, size
+
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while making request to {rpc}: {e}")
+            traceback.print_exc()
+            return None, size
+
+    async def handle_grpc_query(self, callback, query, path):
+        """Calls the Query service method behind path through its generated stub: binary protobuf both ways."""
+        try:
+            import grpc
+        except ImportError as e:
+            logger.error(f"--abci_transport grpc requires grpcio (pip install grpcio): {e}")
+            return None
+
+        try:
+            stub_name, method, _ = GRPC_QUERIES[path]
+            response = await getattr(self.get_grpc_stub(stub_name), method)(query, timeout=self.timeout)
+            AioHttpCalls.received_bytes += response.ByteSize()
+            return await callback(response)
+
+        except grpc.aio.AioRpcError as e:
+            logger.error(f"gRPC request {path} to {flags.grpc} failed with {e.code().name}: {e.details()}")
             return None
 
         except Exception as e:
-            logger.error(f"An unexpected error occurred while making request to {self.rpc}: {e}")
+            logger.error(f"An unexpected error occurred while making gRPC request to {flags.grpc}: {e}")
             traceback.print_exc()
             return None
 
-    def get_pagination_params(self, key, offset, limit, count_total, reverse) -> PageRequest:
+    def get_pagination_params(self, key, offset, limit, count_total, reverse) -> 'PageRequest':
         if key:
             try:
                 key_bytes = base64.b64decode(key)
@@ -114,55 +356,124 @@ class AioHttpCalls:
                 key_bytes = b''
         else:
             key_bytes = b''
-        return PageRequest(key=key_bytes, offset=offset, limit=limit, count_total=count_total, reverse=reverse)
+        return lazy_import('PageRequest')(key=key_bytes, offset=offset, limit=limit, count_total=count_total, reverse=reverse)
+
+    async def get_validators_page(self, status, key = None, offset = None, limit: int = 100, count_total = False):
+        """Fetches and decodes one page of validators. Returns (validators, next_key, total) or None."""
+        pagination = self.get_pagination_params(key=key, offset=offset, limit=limit, count_total=count_total, reverse=False)
+        query = lazy_import('QueryValidatorsRequest')(status=status, pagination=pagination)
+
+        async def process_response(query_response):
+            validators = [decode_validator(validator) for validator in query_response.validators]
+            next_key = base64.b64encode(query_response.pagination.next_key).decode() if query_response.pagination.next_key else None
+            return validators, next_key, query_response.pagination.total
+
+        return await self.handle_abci_request(callback=process_response, query=query, path='/cosmos.staking.v1beta1.Query/Validators')
 
     async def get_validators(self, status: Literal["BOND_STATUS_BONDED", "BOND_STATUS_UNBONDED", "BOND_STATUS_UNBONDING", None],
-                                    limit: int = 1000,
-                                    offset = None,
-                                    count_total = False,
-                                    reverse = False):
+                                    limit: int = None,
+                                    concurrency: int = None):
+        """
+        Fetches the complete validator list page by page, decoding each page as it arrives.
 
-        pagination = self.get_pagination_params(key=None, offset=offset, limit=limit, count_total=count_total, reverse=reverse)
-        query = QueryValidatorsRequest(status=status, pagination=pagination)
-        serialized_query = query.SerializeToString()
-        hex_data = serialized_query.hex()
+        With concurrency 1 pages are followed through next_key. Otherwise the first page also asks
+        for count_total and the remaining pages are requested in parallel by offset. Returns None
+        if any page fails, so callers never see a truncated set.
+        """
+        limit = limit or flags.validators_page_limit
+        concurrency = concurrency or flags.validators_page_concurrency
 
-        async def process_response(response):
-            query_response = QueryValidatorsResponse()
-            query_response.ParseFromString(response)
-            validators = MessageToDict(query_response, preserving_proto_field_name=True)
-            return validators['validators']
+        first_page = await self.get_validators_page(status=status, limit=limit, count_total=concurrency > 1)
+        if first_page is None:
+            return None
+        validators, next_key, total = first_page
 
-        return await self.handle_abci_request(callback=process_response, hex_data=hex_data, path='/cosmos.staking.v1beta1.Query/Validators')
+        if concurrency > 1 and next_key and total > len(validators):
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch_page(offset):
+                async with semaphore:
+                    return await self.get_validators_page(status=status, offset=offset, limit=limit)
+
+            pages = await asyncio.gather(*(fetch_page(offset) for offset in range(limit, total, limit)))
+            # OFFSETS MAY SHIFT IF THE SET CHANGES BETWEEN PAGES, KEEP THE FIRST COPY OF EACH VALIDATOR
+            seen = {validator.get('operator_address') for validator in validators}
+            for page in pages:
+                if page is None:
+                    logger.error(f"Failed to fetch validators page. Skipping incomplete set of {total} validators")
+                    return None
+                for validator in page[0]:
+                    if validator.get('operator_address') not in seen:
+                        seen.add(validator.get('operator_address'))
+                        validators.append(validator)
+            return validators
+
+        while next_key:
+            page = await self.get_validators_page(status=status, key=next_key, limit=limit)
+            if page is None:
+                logger.error(f"Failed to fetch validators page after {len(validators)} validators. Skipping incomplete set")
+                return None
+            validators.extend(page[0])
+            next_key = page[1]
+
+        return validators
 
     async def get_rpc_status(self):
-        url = f"{self.rpc}/status"
+        path = "/status"
 
         async def process_response(response):
             data = await response
             return data['result']
 
-        return await self.handle_request(url, process_response)
+        return await self.handle_request(path, process_response)
 
     async def get_consensus_state(self):
-        url = f"{self.rpc}/consensus_state"
+        path = "/consensus_state"
 
         async def process_response(response):
             data = await response
             return data['result']
 
-        return await self.handle_request(url, process_response)
+        return await self.handle_request(path, process_response)
 
-    async def get_upgrade_info(self):
+    async def get_cometbft_validators(self, per_page: int = 100):
+        """Consensus addresses of the latest CometBFT validator set, in validator index order. None on failure."""
+        addresses = []
+        page = 1
+        height = None
+        while True:
+            # LATER PAGES ARE PINNED TO THE HEIGHT OF THE FIRST ONE, SO ALL PAGES SHOW THE SAME SET
+            path = f"/validators?page={page}&per_page={per_page}" + (f"&height={height}" if height else "")
+
+            async def process_response(response):
+                data = await response
+                return data['result']
 
-        query = QueryCurrentPlanRequest()
-        serialized_query = query.SerializeToString()
-        hex_data = serialized_query.hex()
+            result = await self.handle_request(path, process_response)
+            if not result:
+                return None
+            height = result['block_height']
+            addresses.extend(validator['address'] for validator in result['validators'])
+            if not result['validators'] or len(addresses) >= int(result['total']):
+                return addresses
+            page += 1
+
+    async def get_commit(self, height: int):
+        """Commit (with validator signatures) of the block at height: result.signed_header.commit."""
+        path = f"/commit?height={height}"
 
         async def process_response(response):
-            query_response = QueryCurrentPlanResponse()
-            query_response.ParseFromString(response)
-            data = MessageToDict(query_response, preserving_proto_field_name=True)
+            data = await response
+            return data['result']['signed_header']['commit']
+
+        return await self.handle_request(path, process_response)
+
+    async def get_upgrade_info(self):
+
+        query = lazy_import('QueryCurrentPlanRequest')()
+
+        async def process_response(query_response):
+            data = lazy_import('MessageToDict')(query_response, preserving_proto_field_name=True)
             return data
-        return await self.handle_abci_request(callback=process_response, hex_data=hex_data, path='/cosmos.upgrade.v1beta1.Query/CurrentPlan')
+        return await self.handle_abci_request(callback=process_response, query=query, path='/cosmos.upgrade.v1beta1.Query/CurrentPlan')
     
\ No newline at end of file
@@ -1,22 +1,32 @@
 from base64 import b64decode
 from hashlib import sha256
+from functools import lru_cache
+from typing import Iterable, List
 from bech32 import bech32_encode, convertbits
 from Crypto.Hash import RIPEMD160
 
-def pubkey_to_bech32(pub_key, bech32_prefix, address_refix = ""):
-    pubkey_bytes = b64decode(pub_key)
-    sha256_digest = sha256(pubkey_bytes).digest()
+# CONSENSUS KEYS RARELY CHANGE, SO EVERY VALIDATOR SET REFRESH HITS THE CACHE
+ADDRESS_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def pubkey_bytes_to_address(pubkey_bytes: bytes) -> bytes:
+    """RIPEMD-160(SHA-256(pubkey)) address bytes, memoized by raw pubkey bytes."""
     ripemd160 = RIPEMD160.new()
-    ripemd160.update(sha256_digest)
-    ripemd160_digest = ripemd160.digest()
+    ripemd160.update(sha256(pubkey_bytes).digest())
+    return ripemd160.digest()
+
+def pubkey_to_bech32(pub_key, bech32_prefix, address_refix = ""):
+    ripemd160_digest = pubkey_bytes_to_address(b64decode(pub_key))
     converted_bits = convertbits(ripemd160_digest, 8, 5)
     return bech32_encode(f"{bech32_prefix+address_refix}", converted_bits)
 
 def pubkey_to_consensus_hex(pub_key):
-    pubkey_bytes = b64decode(pub_key)
-    sha256_digest = sha256(pubkey_bytes).digest()
-    ripemd160 = RIPEMD160.new()
-    ripemd160.update(sha256_digest)
-    ripemd160_digest = ripemd160.digest()
-    consensus_hex = ''.join(format(byte, '02x') for byte in ripemd160_digest).upper()
-    return consensus_hex
\ No newline at end of file
+    return pubkey_bytes_to_address(b64decode(pub_key)).hex().upper()
+
+def pubkeys_to_consensus_hex(pub_keys: Iterable[str]) -> List[str]:
+    """
+    Convenience wrapper converting a list of base64 pubkeys to consensus hex addresses. Not
+    vectorized: every key still goes through the memoized pubkey_bytes_to_address on its own.
+    """
+    to_address = pubkey_bytes_to_address
+    return [to_address(b64decode(pub_key)).hex().upper() for pub_key in pub_keys]
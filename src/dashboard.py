@@ -1,29 +1,57 @@
 import re
 import asyncio
+import logging
 from collections import deque
+from typing import List, Literal, Optional
 from rich.console import Console
 from rich.table import Table
 from rich.live import Live
 from rich.layout import Layout
 from rich.panel import Panel
+from rich.markup import escape
 from src.calls import AioHttpCalls
-from src.converter import pubkey_to_consensus_hex
+from src.validator_registry import ValidatorRegistry
+from src.vote_parser import parse_vote_blocks
+from src.bit_array import BitArray, VoteSet
+from src.vote_tally import VoteTally
+from utils.logger import redirect_console_logging, restore_console_logging
+from src.websocket import websocket_connect
+
+class LogLinesHandler(logging.Handler):
+    """Appends log messages to the dashboard Logs panel."""
+
+    def __init__(self, log_lines: deque):
+        super().__init__()
+        self.log_lines = log_lines
+
+    def emit(self, record):
+        try:
+            self.log_lines.append(escape(f"{record.levelname.ljust(8)}| {record.getMessage()}"))
+        except Exception:
+            self.handleError(record)
 
 class ConsensusDashboard:
-    def __init__(self, refresh_per_second: int, disable_emojis: bool):
+    def __init__(self, refresh_per_second: int, disable_emojis: bool,
+                 source: Literal["rpc", "ws"] = 'rpc',
+                 ws: Optional[List[str]] = None,
+                 ws_events: Optional[List[dict]] = None,
+                 registry: Optional[ValidatorRegistry] = None):
         self.num_columns = 4
         self.layout = Layout()
         self.console = Console()
         self.log_lines = deque(maxlen=10)
         self.validators = []
+        # RICH LIVE OWNS THE TERMINAL, REGISTRY UPDATES ARE REPORTED THROUGH log_lines
+        self.registry = registry or ValidatorRegistry(log_updates=False)
+        self.registry_version = 0
         self.current_round_consensus_state = {
             'height': -1,
             'round': -1,
             'step': -1,
             'prevote_array': 0.0,
             'precommits_array': 0.0,
-            'hex_prevote': {},
-            'hex_precommit': {}
+            'prevotes': VoteSet(0),
+            'precommits': VoteSet(0)
         }
         self.chain_id = None
         self.catching_up = False
@@ -33,6 +61,12 @@ class ConsensusDashboard:
         self.refresh_per_second = refresh_per_second
         self.disable_emojis = disable_emojis
 
+        # WITH WS SOURCE PROGRESS IS COMPUTED LOCALLY FROM VOTE EVENTS INSTEAD OF POLLING /consensus_state
+        self.source = source
+        self.ws = ws
+        self.ws_events = ws_events
+        self.tally = VoteTally()
+
         self.layout.split_column(
             Layout(name="header", ratio=1),
             Layout(name="main", ratio=5),
@@ -65,35 +99,26 @@ class ConsensusDashboard:
 
     async def update_validators(self):
         try:
-            async with AioHttpCalls() as session:
-                data = await session.get_validators(status='BOND_STATUS_BONDED')
-                if not data:
-                    self.log_lines.append("Failed to fetch validators. Will retry")
-                    return
-            
-                if data:
-                    sorted_vals = sorted(data, key=lambda x: int(x['tokens']), reverse=True)
-                    validators = []
-                    total_stake = sum(int(x['tokens']) for x in sorted_vals)
-                    for validator  in sorted_vals:
-                        _consensus_pub_key = validator.get('consensus_pubkey',{}).get('key')
-                        if not _consensus_pub_key:
-                            self.log_lines.append(f'Skipping validator due too missing consensus_pub_key: {validator}')
-                            continue
-                        _moniker = self.demojize(validator.get('description',{}).get('moniker', 'N/A'))
-                        _tokens = int(validator['tokens'])
-
-                        _hex = pubkey_to_consensus_hex(pub_key=_consensus_pub_key)
-                        validators.append({
-                            'moniker': _moniker,
-                            'hex': _hex,
-                            'vp': round((_tokens / total_stake) * 100, 4)
-                            })
-
-                    
-                    self.validators = validators
-                    self.log_lines.append(f"Updated validators | Current active set: {len(self.validators)}")
-                    return True
+            if not await self.registry.update():
+                self.log_lines.append("Failed to fetch validators. Will retry")
+                return
+
+            # UNCHANGED SET: REGISTRY VERSION ONLY MOVES WHEN VALIDATORS CHANGED
+            snapshot = self.registry.snapshot()
+            if snapshot.version == self.registry_version:
+                return False
+
+            self.validators = [{
+                'moniker': self.demojize(validator['moniker']),
+                'hex': validator['hex'],
+                'index': validator['index'],
+                'tokens': validator['tokens'],
+                'vp': validator['vp']
+                } for validator in snapshot.validators]
+            self.registry_version = snapshot.version
+            self.tally.set_validators(self.validators)
+            self.log_lines.append(f"Updated validators | Current active set: {len(self.validators)}")
+            return True
         except Exception:
             self.log_lines.append(f"An error occurred while updating validators")
 
@@ -122,29 +147,12 @@ class ConsensusDashboard:
             self.current_round_consensus_state['prevote_array'] = _prevote_array
             self.current_round_consensus_state['precommits_array'] = _precommits_array
 
-            _online_precommit = 0
-            _precommits_hex = {}
-            for precommit in consensus['precommits']:
-                if 'SIGNED_MSG_TYPE_PRECOMMIT(Precommit)' in precommit:
-                    _online_precommit += 1
-                    commit = precommit.split()[2]
-                    hex = precommit.split()[0][-12:]
-                    _precommits_hex[hex] = commit
-                else:
-                    continue
-            self.current_round_consensus_state['hex_precommit'] = _precommits_hex
-            
-            _online_prevote = 0
-            _prevotes_hex = {}
-            for prevote in consensus['prevotes']:
-                if 'SIGNED_MSG_TYPE_PREVOTE(Prevote)' in prevote:
-                    _online_prevote += 1
-                    vote = prevote.split()[2]
-                    hex = prevote.split()[0][-12:]
-                    _prevotes_hex[hex] = vote
-                else:
-                    continue
-            self.current_round_consensus_state['hex_prevote'] = _prevotes_hex
+            _size = len(BitArray.from_string(consensus['prevotes_bit_array']))
+            self.current_round_consensus_state['precommits'] = VoteSet.from_blocks(_size, parse_vote_blocks(consensus['precommits'], 'Precommit'))
+            _online_precommit = self.current_round_consensus_state['precommits'].count()
+
+            self.current_round_consensus_state['prevotes'] = VoteSet.from_blocks(_size, parse_vote_blocks(consensus['prevotes'], 'Prevote'))
+            _online_prevote = self.current_round_consensus_state['prevotes'].count()
             self.online_validators = _online_prevote if _online_prevote > _online_precommit else _online_precommit
 
             self.log_lines.append(f"Updated consensus state | {data['round_state']['height/round/step']}")
@@ -154,6 +162,57 @@ class ConsensusDashboard:
             self.log_lines.append(f"An unexpected error occurred while processing consensus_state {e}")
             return
         
+    async def process_new_event_callback(self, data):
+        try:
+            event_data = data['result']['data']['value']
+            event = data['result']['query'].split('=')[-1].strip("'")
+
+            if event == 'Vote':
+                vote = event_data['Vote']
+                _vote_type = 'Prevote' if vote['type'] == 1 else 'Precommit'
+                self.tally.add_vote(
+                    height=int(vote['height']),
+                    _round=int(vote['round']),
+                    _vote_type=_vote_type,
+                    validator_index=int(vote['validator_index']),
+                    validator_hex=vote['validator_address'],
+                    block_hash=vote['block_id']['hash']
+                )
+
+            elif event == 'NewRoundStep':
+                self.tally.new_round_step(int(event_data['height']), int(event_data['round']), event_data['step'])
+
+        except Exception as e:
+            self.log_lines.append(f"An error occurred while processing websocket event {e}")
+
+    def update_from_tally(self):
+        _round = self.tally.round
+        self.current_round_consensus_state['height'] = self.tally.height
+        self.current_round_consensus_state['round'] = _round
+        self.current_round_consensus_state['step'] = self.tally.step
+        self.current_round_consensus_state['prevote_array'] = self.tally.power_fraction(_round, 'Prevote') * 100
+        self.current_round_consensus_state['precommits_array'] = self.tally.power_fraction(_round, 'Precommit') * 100
+        self.online_validators = self.tally.online_count(_round)
+        return True
+
+    def has_voted(self, validator: dict, _vote_type: str) -> bool:
+        if self.source == 'ws':
+            return self.tally.has_voted(self.tally.round, _vote_type, validator['hex'])
+        # VOTE SETS ARE INDEXED BY THE CometBFT VALIDATOR INDEX THE REGISTRY TRACKS
+        _index = validator['index']
+        return _index is not None and _index in self.current_round_consensus_state['prevotes' if _vote_type == 'Prevote' else 'precommits']
+
+    def get_tally_summary(self) -> str:
+        """+2/3 crossing delays and power per voted block of the current round."""
+        _round = self.tally.round
+        lines = []
+        for _vote_type in ('Prevote', 'Precommit'):
+            delay = self.tally.crossing_delay(_round, _vote_type)
+            blocks = sorted(self.tally.block_fractions(_round, _vote_type).items(), key=lambda x: x[1], reverse=True)
+            blocks_str = ' | '.join(f"{(block_hash[:8] or 'nil')} {fraction * 100:.1f}%" for block_hash, fraction in blocks[:2])
+            lines.append(f"[bold yellow]{_vote_type} +2/3:[/bold yellow] {f'{delay:.2f}s' if delay is not None else '-'}   {blocks_str}")
+        return "\n".join(lines)
+
     def create_bar(self, label: str, value: float) -> str:
         bar_length = 40
         filled_length = int(value * bar_length // 100)
@@ -170,14 +229,13 @@ class ConsensusDashboard:
         for index, validator in enumerate(self.validators):
             column_index = index % self.num_columns
             moniker = validator['moniker'][:15].ljust(20)
-            _hex_short = validator['hex'][:12]
             _voting_power = validator['vp']
 
             _prevoted = "[ V ]" if self.disable_emojis else "✅"
             _not_prevoted = "[ X ]" if self.disable_emojis else "❌"
 
-            prevote_emoji = _prevoted if self.current_round_consensus_state['hex_prevote'].get(_hex_short) else _not_prevoted
-            precommit_emoji = _prevoted if self.current_round_consensus_state['hex_precommit'].get(_hex_short) else _not_prevoted
+            prevote_emoji = _prevoted if self.has_voted(validator, 'Prevote') else _not_prevoted
+            precommit_emoji = _prevoted if self.has_voted(validator, 'Precommit') else _not_prevoted
 
             index_str = f"{index + 1}.".ljust(4)
 
@@ -196,6 +254,11 @@ class ConsensusDashboard:
         return table
 
     async def start(self):
+        ws_task = None
+        if self.source == 'ws':
+            ws_task = asyncio.create_task(websocket_connect(ws=self.ws, events=self.ws_events, callback=self.process_new_event_callback))
+        # RICH LIVE REDRAWS THE WHOLE TERMINAL: LOG RECORDS GO TO THE LOGS PANEL, NOT TO STDERR
+        redirect_console_logging(LogLinesHandler(self.log_lines))
         try:
             with Live(self.layout, refresh_per_second=self.refresh_per_second) as _:
                 while True:
@@ -207,7 +270,9 @@ class ConsensusDashboard:
                         upd_vals = await self.update_validators()
                         self._last_validators_update = asyncio.get_event_loop().time()
 
-                    if not hasattr(self, "_last_consensus_update") or (asyncio.get_event_loop().time() - self._last_consensus_update) >= 1:
+                    if self.source == 'ws':
+                        upd_cons = self.update_from_tally()
+                    elif not hasattr(self, "_last_consensus_update") or (asyncio.get_event_loop().time() - self._last_consensus_update) >= 1:
                         upd_cons = await self.update_current_consensus_state()
                         self._last_consensus_update = asyncio.get_event_loop().time()
 
@@ -218,6 +283,8 @@ class ConsensusDashboard:
                         precommit_bar = self.create_bar("[Precommits]", self.current_round_consensus_state['precommits_array'])
 
                         votes_commits_renderable = f"{prevote_bar}\n{precommit_bar}"
+                        if self.source == 'ws':
+                            votes_commits_renderable += f"\n{self.get_tally_summary()}"
                         votes_commits_panel = Panel(votes_commits_renderable, title="Prevotes & Precommits", border_style="yellow")
 
                         self.layout["header"]["votes_commits_bar"].update(votes_commits_panel)
@@ -245,4 +312,8 @@ class ConsensusDashboard:
         except asyncio.CancelledError:
             pass
         finally:
+            if ws_task:
+                ws_task.cancel()
+            await AioHttpCalls.close_shared_session()
             self.console.clear()
+            restore_console_logging()
@@ -0,0 +1,129 @@
+import time
+from collections import deque
+from typing import List, Optional
+from utils.logger import logger
+
+class EndpointStats:
+    """Latency window (answered requests only) and outcome window of a single RPC endpoint."""
+    __slots__ = ('url', 'latencies', 'outcomes', 'requests', 'received_bytes', 'consecutive_errors', 'benched_until', 'probation', '_sorted')
+
+    def __init__(self, url: str, window: int, error_window: int):
+        self.url = url
+        self.latencies = deque(maxlen=window)
+        # 1 FOR A FAILED REQUEST, 0 FOR A SUCCESSFUL ONE
+        self.outcomes = deque(maxlen=error_window)
+        self.requests = 0
+        # RESPONSE BODY BYTES OF FINISHED REQUESTS
+        self.received_bytes = 0
+        self.consecutive_errors = 0
+        self.benched_until = 0.0
+        self.probation = False
+        self._sorted = None
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self.latencies)
+        return self._sorted[min(int(len(self._sorted) * q), len(self._sorted) - 1)]
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def score(self) -> float:
+        """Median latency of answered requests. Endpoints without samples score 0 so they get tried."""
+        p50 = self.percentile(0.5)
+        return 0.0 if p50 is None else p50
+
+class EndpointPool:
+    """
+    Health-scored set of RPC endpoints of one process.
+
+    Health comes first: an endpoint failing MAX_CONSECUTIVE_ERRORS requests in a row, or more than
+    MAX_ERROR_RATE of its last `error_window` requests, is benched for RETRY_AFTER seconds and only
+    used if no other endpoint is available. Its next request after the bench is a probe, a failed
+    probe benches it again. Endpoints that are not benched are ranked by median latency of answered
+    requests. The p95 latency of an endpoint is the delay after which a hedged duplicate request
+    goes to the next endpoint.
+    """
+    MAX_CONSECUTIVE_ERRORS = 3
+    MAX_ERROR_RATE = 0.1
+    MIN_ERROR_SAMPLES = 10
+    RETRY_AFTER = 30.0
+    MIN_HEDGE_SAMPLES = 20
+    STATS_INTERVAL = 60.0
+
+    def __init__(self, urls: List[str], window: int = 200, error_window: int = 50, hedge_delay: float = 1.0, min_hedge_delay: float = 0.05):
+        self.endpoints = [EndpointStats(url.rstrip('/'), window, error_window) for url in dict.fromkeys(urls)]
+        self.hedge_delay_default = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.best = None
+        self.stats_logged_at = time.monotonic()
+
+    def ranked(self) -> List[EndpointStats]:
+        """Healthy endpoints by score, then benched ones by the time they may be retried."""
+        now = time.monotonic()
+        healthy = []
+        benched = []
+        for endpoint in self.endpoints:
+            if now >= endpoint.benched_until:
+                healthy.append(endpoint)
+            else:
+                benched.append(endpoint)
+        healthy.sort(key=EndpointStats.score)
+        benched.sort(key=lambda endpoint: endpoint.benched_until)
+        ranked = healthy + benched
+
+        if ranked[0] is not self.best:
+            if self.best is not None:
+                logger.info(f"Routing RPC requests to {ranked[0].url}")
+            self.best = ranked[0]
+        return ranked
+
+    def record(self, endpoint: EndpointStats, latency: float, ok: bool):
+        """Records a finished request. Only answered requests count towards latency."""
+        endpoint.requests += 1
+        endpoint.outcomes.append(0 if ok else 1)
+        if ok:
+            self.record_latency(endpoint, latency)
+            endpoint.consecutive_errors = 0
+            endpoint.probation = False
+        else:
+            endpoint.consecutive_errors += 1
+            if endpoint.probation:
+                self.bench(endpoint, "failed the probe after its bench")
+            elif endpoint.consecutive_errors >= self.MAX_CONSECUTIVE_ERRORS:
+                self.bench(endpoint, f"failed {endpoint.consecutive_errors} requests in a row")
+            elif len(endpoint.outcomes) >= self.MIN_ERROR_SAMPLES and endpoint.error_rate() > self.MAX_ERROR_RATE:
+                self.bench(endpoint, f"failed {endpoint.error_rate():.0%} of its last {len(endpoint.outcomes)} requests")
+
+        if time.monotonic() - self.stats_logged_at >= self.STATS_INTERVAL:
+            self.log_stats()
+
+    def record_latency(self, endpoint: EndpointStats, latency: float):
+        endpoint.latencies.append(latency)
+        endpoint._sorted = None
+
+    def bench(self, endpoint: EndpointStats, reason: str):
+        """Takes the endpoint out of rotation. Its error state starts over with the probe."""
+        endpoint.benched_until = time.monotonic() + self.RETRY_AFTER
+        endpoint.probation = True
+        endpoint.consecutive_errors = 0
+        endpoint.outcomes.clear()
+        if len(self.endpoints) > 1:
+            logger.warning(f"RPC {endpoint.url} {reason}. Benched for {self.RETRY_AFTER}s")
+
+    def hedge_delay(self, endpoint: EndpointStats) -> float:
+        """Seconds to wait for the endpoint before sending a duplicate request elsewhere."""
+        if len(endpoint.latencies) < self.MIN_HEDGE_SAMPLES:
+            return self.hedge_delay_default
+        return max(endpoint.percentile(0.95), self.min_hedge_delay)
+
+    def log_stats(self):
+        self.stats_logged_at = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.latencies:
+                continue
+            logger.debug("RPC %s | Requests: %s | p50: %.1f ms, p95: %.1f ms, p99: %.1f ms | Errors: %.1f%% | Received: %.1f KiB",
+                         endpoint.url, endpoint.requests, endpoint.percentile(0.5) * 1000, endpoint.percentile(0.95) * 1000,
+                         endpoint.percentile(0.99) * 1000, endpoint.error_rate() * 100, endpoint.received_bytes / 1024)
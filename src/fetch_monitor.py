@@ -1,11 +1,13 @@
 import traceback
-import os
-import json
-import asyncio
-from typing import List
+from typing import List, Literal
 from utils.logger import logger
 from src.calls import AioHttpCalls
-from src.converter import pubkey_to_consensus_hex
+from src.validator_registry import ValidatorRegistry
+from src.storage import create_storage
+from src.poller import AdaptivePoller
+from src.timeline import ConsensusTimeline
+from src.vote_parser import parse_vote_blocks
+from src.bit_array import BitArray, VoteSet
 
 class FetchConsensusMonitoring:
     def __init__(self,
@@ -13,96 +15,121 @@ class FetchConsensusMonitoring:
                  target_height: str,
                  save_all: bool,
                  no_save: bool,
-                 sleep_time_between: int
+                 poll_rate: float,
+                 poll_fast_rate: float,
+                 poll_slow_rate: float,
+                 storage: Literal["json", "sqlite"] = 'json',
+                 sqlite_path: str = 'result/consensus.db',
+                 registry: ValidatorRegistry = None
                  ):
-        self.sleep_time_between = sleep_time_between
+        self.poller = AdaptivePoller(rate=poll_rate, fast_rate=poll_fast_rate, slow_rate=poll_slow_rate)
         self.target_height = target_height
         self.save_all = save_all
         self.no_save = no_save
         self.check_blocks_list = post_target_check_blocks
+        self.storage = None if no_save else create_storage(backend=storage, sqlite_path=sqlite_path)
 
-        self.validators = {}
+        self.registry = registry or ValidatorRegistry()
 
         self.current_round_consensus_state = {
             'height': -1,
             'round': -1,
             'step': -1,
-            'validators': {},
+            'validators': [],
             'prevote_array': 0.0,
             'precommits_array': 0.0,
+            'prevotes': VoteSet(0),
+            'precommits': VoteSet(0),
         }
 
         self.all_rounds_consensus_state = {}
 
+        self.timeline = ConsensusTimeline()
+
+        # CHANGE DETECTION
+        self.last_fingerprint = None
+        self.polls_total = 0
+        self.polls_unchanged = 0
+
+    def get_fingerprint(self, consensus: dict) -> tuple:
+        """Cheap identity of a /consensus_state response: height/round/step plus vote bit arrays of every round."""
+        round_state = consensus['round_state']
+        return (
+            round_state['height/round/step'],
+            tuple((votes['prevotes_bit_array'], votes['precommits_bit_array']) for votes in round_state['height_vote_set'])
+        )
+
+    def should_save(self, height: int) -> bool:
+        return not self.no_save and (str(height) == self.target_height or self.save_all or str(height) in self.check_blocks_list)
+
+    def save_timeline(self, timeline: dict):
+        if timeline and self.should_save(timeline['height']):
+            self.storage.save_timeline(timeline['height'], timeline)
+
     async def update_validators(self):
-        try:
-            async with AioHttpCalls() as session:
-                data = await session.get_validators(status='BOND_STATUS_BONDED')
-                if data:
-                    validators = {}
-                    for validator  in data:
-                        _consensus_pub_key = validator['consensus_pubkey']['key']
-                        if not _consensus_pub_key:
-                            logger.warning(f'Skipping validator due too missing consensus_pub_key: {validator}')
-                            continue
-                        _moniker = validator.get('description',{}).get('moniker', 'N/A')
-                        _valoper = validator.get('operator_address', '')
-
-                        _hex = pubkey_to_consensus_hex(pub_key=_consensus_pub_key)
-                        validators[_hex] = {
-                            'moniker': _moniker,
-                            'hex': _hex,
-                            'valoper': _valoper,
-                            'consensus_pubkey': _consensus_pub_key,
-                            }
-                
-                    self.validators = validators
-                    logger.info("------------------------------------------------------")
-                    logger.info(f"Updated validators | Current active set: {len(self.validators)}")
-
-        except Exception as e:
-            logger.error(f"An error occurred while updating validators: {e}")
-            traceback.print_exc()
+        """Asks the shared validator registry for a fresh validator set."""
+        await self.registry.update()
 
     async def start(self):
         logger.info("------------------------------------------------------")
         logger.info("Fetching validators")
-        await self.update_validators()
+        if not self.registry.snapshot(force_check=True):
+            await self.update_validators()
 
-        if not self.validators:
+        if not self.registry.snapshot():
             logger.error("Failed to fetch validators. Exiting")
             exit()
 
-        await self.update_current_consensus_state()
+        try:
+            await self.update_current_consensus_state()
+        finally:
+            if self.storage:
+                self.save_timeline(self.timeline.close())
+                self.storage.close()
+            await AioHttpCalls.close_shared_session()
 
     async def update_current_consensus_state(self):
         while True:
+            await self.poller.wait()
             try:
                 async with AioHttpCalls() as session:
                     consensus = await session .get_consensus_state()
                 if not consensus:
                     logger.error(f"Failed to fetch consensus_state. Retrying")
+                    self.poller.observe_failure()
                     continue
 
-                self.all_rounds_consensus_state = consensus
                 height_round_step = consensus['round_state']['height/round/step'].split('/')
                 _height = int(height_round_step[0])
                 _round = int(height_round_step[1])
                 _step = int(height_round_step[2])
+                self.poller.observe(_height, _round, _step)
 
-                if not self.no_save and (str(_height) == self.target_height or self.save_all or str(_height) in self.check_blocks_list):
-                    file_path = f"result/{_height}/fetch_votes.json"
-                    logger.debug(f"Saving fetched /consensus_state {_height}/{_round}/{_step} [{file_path}]")
-                    os.makedirs(f"result/{_height}", exist_ok=True)
-                    with open(file_path, 'w') as f:
-                        json.dump(self.all_rounds_consensus_state, f, indent=4)
-                    logger.debug(f"Saved fetched /consensus_state {_height}/{_round}/{_step} [{file_path}]")
+                # SKIP PARSING AND SAVING IF NOTHING CHANGED SINCE LAST POLL
+                self.polls_total += 1
+                fingerprint = self.get_fingerprint(consensus)
+                if fingerprint == self.last_fingerprint:
+                    self.polls_unchanged += 1
+                    continue
+
+                if self.last_fingerprint and self.last_fingerprint[0].split('/')[0] != height_round_step[0]:
+                    logger.debug(f"/consensus_state polls: {self.polls_total} | Unchanged skipped: {self.polls_unchanged} ({self.polls_unchanged / self.polls_total * 100:.1f}%)")
+                self.last_fingerprint = fingerprint
+                self.all_rounds_consensus_state = consensus
+
+                if self.should_save(_height):
+                    self.storage.save_consensus_state(_height, _round, _step, self.all_rounds_consensus_state)
                 else:
                     logger.debug(f"Skiping {_height}/{_round} for /consensus_state | Target: {self.target_height}")
 
+                if self.storage:
+                    self.save_timeline(self.timeline.observe(_height, _round, _step, consensus))
+
                 self.current_round_consensus_state['round'] = _round
                 self.current_round_consensus_state['height'] = _height
                 self.current_round_consensus_state['step'] = _step
+                # VOTES ARE INDEXED BY POSITION IN THE CONSENSUS VALIDATOR SET
+                self.current_round_consensus_state['validators'] = [validator['address'] for validator in consensus['round_state']['validators']['validators']]
 
                 consensus = consensus['round_state']['height_vote_set'][_round]
 
@@ -111,31 +138,11 @@ class FetchConsensusMonitoring:
                 self.current_round_consensus_state['prevote_array'] = _prevote_array
                 self.current_round_consensus_state['precommits_array'] = _precommits_array
 
-                _precommits_hex = {}
-                for precommit in consensus['precommits']:
-                    commit = precommit.split()[2] if 'SIGNED_MSG_TYPE_PRECOMMIT(Precommit)' in precommit else 'nil-Vote'
-                    hex = precommit.split()[0][-12:] if 'SIGNED_MSG_TYPE_PRECOMMIT(Precommit)' in precommit else 'nil-Vote'
-                    _precommits_hex[hex] = commit
-
-                _prevotes_hex = {}
-                for prevote in consensus['prevotes']:
-                    vote = prevote.split()[2] if 'SIGNED_MSG_TYPE_PREVOTE(Prevote)' in prevote else 'nil-Vote'
-                    hex = prevote.split()[0][-12:] if 'SIGNED_MSG_TYPE_PREVOTE(Prevote)' in prevote else 'nil-Vote'
-                    _prevotes_hex[hex] = vote
-
-                for _hex, validator in self.validators.items():
-                    _hex_short = hex[:12]
-                    _prevote = _prevotes_hex.get(_hex_short, 'nil-Vote')
-                    _precommit = _precommits_hex.get(_hex_short, 'nil-Vote')
-
-                    if _hex not in self.current_round_consensus_state['validators']:
-                        self.current_round_consensus_state['validators'][_hex] = validator
-                    self.current_round_consensus_state['validators'][_hex]['prevote'] = _prevote
-                    self.current_round_consensus_state['validators'][_hex]['precommit'] = _precommit
-
-                if self.sleep_time_between:
-                    await asyncio.sleep(self.self.refresh_rate)
+                _size = len(BitArray.from_string(consensus['prevotes_bit_array']))
+                self.current_round_consensus_state['prevotes'] = VoteSet.from_blocks(_size, parse_vote_blocks(consensus['prevotes'], 'Prevote'))
+                self.current_round_consensus_state['precommits'] = VoteSet.from_blocks(_size, parse_vote_blocks(consensus['precommits'], 'Precommit'))
 
             except Exception as e:
                 logger.error(f"An unexpected error occurred while processing consensus_state: {consensus} {e}")
-                traceback.print_exc()
\ No newline at end of file
+                traceback.print_exc()
+                self.poller.observe_failure()
\ No newline at end of file
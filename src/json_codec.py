@@ -0,0 +1,38 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, catch this one for both backends
+JSONDecodeError = json.JSONDecodeError
+BACKEND = 'orjson' if orjson else 'json'
+
+if orjson:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """Decodes JSON with orjson when installed, stdlib json otherwise."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumpb(obj: Any, indent: bool = False) -> bytes:
+    """
+    Encodes to UTF-8 JSON bytes. Compact output goes through orjson when installed, falling back
+    to stdlib json for values orjson rejects (e.g. integers above 64 bits).
+    """
+    if indent:
+        # RESULT FILES KEEP THE EXACT json.dump(indent=4) LAYOUT. orjson ONLY INDENTS WITH 2 SPACES
+        return json.dumps(obj, indent=4).encode('utf-8')
+    if orjson:
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    return dumpb(obj, indent=indent).decode('utf-8')
@@ -0,0 +1,60 @@
+import json
+from typing import Dict, Optional, Tuple
+from src import json_codec
+
+# FIELDS process_new_block_entry READS: block.header and block.last_commit, in document order
+NEW_BLOCK_QUERY = "tm.event='NewBlock'"
+NEW_BLOCK_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'header': ('height', 'proposer_address'),
+    'last_commit': ('height', 'round', 'signatures'),
+}
+
+# CometBFT puts "query" right after "result", so the event name is always near the start
+QUERY_SEARCH_WINDOW = 256
+WHITESPACE = ' \t\n\r'
+DECODER = json.JSONDecoder()
+
+def decode_partial(raw: str, anchor: str, fields: Dict[str, Tuple[str, ...]]) -> Optional[dict]:
+    """
+    Decodes only the listed objects of a JSON document, in document order, starting after anchor.
+
+    Each key is located with str.find and only its value is decoded, everything between (txs,
+    evidence, ...) is skipped without being parsed. Decoded objects are projected to the listed
+    fields. Returns None if a key or field is missing, so callers can fall back to a full decode.
+    """
+    position = raw.find(anchor)
+    if position == -1:
+        return None
+
+    result = {}
+    for key, subfields in fields.items():
+        key_token = f'"{key}":'
+        position = raw.find(key_token, position)
+        if position == -1:
+            return None
+        position += len(key_token)
+        while raw[position] in WHITESPACE:
+            position += 1
+
+        value, position = DECODER.raw_decode(raw, position)
+        if not isinstance(value, dict) or any(subfield not in value for subfield in subfields):
+            return None
+        result[key] = {subfield: value[subfield] for subfield in subfields}
+    return result
+
+def decode_new_block_event(raw) -> dict:
+    """
+    Decodes a NewBlock websocket message into the usual message shape, keeping only
+    block.header and block.last_commit fields. Falls back to a full decode if the
+    message does not look as expected.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        raw = raw.decode('utf-8')
+    if isinstance(raw, str) and raw.find(NEW_BLOCK_QUERY, 0, QUERY_SEARCH_WINDOW) != -1:
+        try:
+            block = decode_partial(raw, '"block":', NEW_BLOCK_FIELDS)
+        except (ValueError, IndexError):
+            block = None
+        if block:
+            return {'result': {'query': NEW_BLOCK_QUERY, 'data': {'type': 'tendermint/event/NewBlock', 'value': {'block': block}}}}
+    return json_codec.loads(raw)
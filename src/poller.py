@@ -0,0 +1,56 @@
+import time
+import asyncio
+
+class AdaptivePoller:
+    """
+    Paces /consensus_state polls according to the consensus step.
+
+    Step numbers follow CometBFT RoundStepType:
+    1 NewHeight, 2 NewRound, 3 Propose, 4 Prevote, 5 PrevoteWait, 6 Precommit, 7 PrecommitWait, 8 Commit.
+    Votes accumulate during prevote/precommit steps, so those are polled at fast_rate. Propose and
+    commit waits are polled at slow_rate. Right after a step transition a few polls are made at
+    fast_rate to catch the next change. Rates are polls per second.
+    """
+    VOTING_STEPS = {4, 5, 6, 7}
+    WAITING_STEPS = {1, 2, 3, 8}
+
+    def __init__(self, rate: float, fast_rate: float, slow_rate: float, burst_polls: int = 3):
+        self.rate = rate
+        self.fast_rate = fast_rate
+        self.slow_rate = slow_rate
+        self.burst_polls = burst_polls
+
+        self.current_rate = rate
+        self.last_height_round_step = None
+        self.burst_left = 0
+        self.last_poll_at = None
+
+    def observe(self, height: int, _round: int, _step: int):
+        """Picks the rate for the next poll from the latest height/round/step."""
+        height_round_step = (height, _round, _step)
+        if height_round_step != self.last_height_round_step:
+            self.last_height_round_step = height_round_step
+            self.burst_left = self.burst_polls
+
+        if self.burst_left > 0:
+            self.burst_left -= 1
+            self.current_rate = self.fast_rate
+        elif _step in self.VOTING_STEPS:
+            self.current_rate = self.fast_rate
+        elif _step in self.WAITING_STEPS:
+            self.current_rate = self.slow_rate
+        else:
+            self.current_rate = self.rate
+
+    def observe_failure(self):
+        """Backs off after a failed poll."""
+        self.burst_left = 0
+        self.current_rate = self.slow_rate
+
+    async def wait(self):
+        """Sleeps until the next poll is due. Time spent on the previous request counts towards the interval."""
+        if self.last_poll_at is not None and self.current_rate > 0:
+            delay = 1 / self.current_rate - (time.monotonic() - self.last_poll_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self.last_poll_at = time.monotonic()
@@ -0,0 +1,246 @@
+import os
+import time
+import sqlite3
+from typing import Literal, Optional
+from utils.logger import logger
+from src import json_codec
+
+class JsonStorage:
+    """Stores metrics as pretty-printed JSON files under result/<height>/."""
+
+    def __init__(self, base_dir: str = 'result'):
+        self.base_dir = base_dir
+
+    def get_path(self, height: str, file_name: str) -> str:
+        return os.path.join(self.base_dir, str(height), file_name)
+
+    def write_file(self, file_path: str, data: dict, compact: bool = False):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json_codec.dumpb(data, indent=not compact))
+        os.replace(tmp_path, file_path)
+
+    def load_votes(self, height: str) -> Optional[dict]:
+        file_path = self.get_path(height, 'ws_votes.json')
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            try:
+                return json_codec.loads(f.read())
+            except json_codec.JSONDecodeError as e:
+                logger.error(f"Failed to load {file_path} {e}")
+                return None
+
+    def save_votes(self, height: str, state: dict):
+        file_path = self.get_path(height, 'ws_votes.json')
+        self.write_file(file_path, state)
+        logger.debug(f"Saved #{height} votes [{file_path}]")
+
+    def save_signatures(self, height: str, data: dict):
+        file_path = self.get_path(height, 'ws_signatures.json')
+        if not os.path.exists(file_path):
+            self.write_file(file_path, data)
+            logger.debug(f"Saved #{height} signatures [{file_path}]")
+
+    def save_consensus_state(self, height: int, _round: int, _step: int, consensus: dict):
+        file_path = self.get_path(height, 'fetch_votes.json')
+        self.write_file(file_path, consensus)
+        logger.debug(f"Saved fetched /consensus_state {height}/{_round}/{_step} [{file_path}]")
+
+    def save_timeline(self, height: int, timeline: dict):
+        file_path = self.get_path(height, 'fetch_timeline.json')
+        self.write_file(file_path, timeline, compact=True)
+        logger.debug(f"Saved #{height} /consensus_state timeline [{file_path}]")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class SqliteStorage:
+    """
+    Stores metrics in a single WAL-mode SQLite database.
+
+    Votes and signatures of a height are written in one transaction. /consensus_state snapshots
+    are buffered (latest per height wins, like fetch_votes.json) and committed in batches.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS votes (
+            height INTEGER NOT NULL,
+            round INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            validator TEXT NOT NULL,
+            timestamp TEXT,
+            hash TEXT,
+            signature TEXT,
+            source TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS votes_unique ON votes (height, round, type, validator, timestamp, hash, signature);
+        CREATE INDEX IF NOT EXISTS votes_height_round_validator ON votes (height, round, validator);
+        CREATE INDEX IF NOT EXISTS votes_validator_height ON votes (validator, height);
+
+        CREATE TABLE IF NOT EXISTS blocks (
+            height INTEGER PRIMARY KEY,
+            proposer TEXT,
+            total_signed INTEGER,
+            total_missed INTEGER
+        );
+
+        CREATE TABLE IF NOT EXISTS signatures (
+            height INTEGER NOT NULL,
+            validator TEXT NOT NULL,
+            moniker TEXT,
+            valoper TEXT,
+            signed INTEGER NOT NULL,
+            timestamp TEXT,
+            signature TEXT,
+            PRIMARY KEY (height, validator)
+        );
+        CREATE INDEX IF NOT EXISTS signatures_validator_height ON signatures (validator, height);
+
+        CREATE TABLE IF NOT EXISTS consensus_states (
+            height INTEGER PRIMARY KEY,
+            round INTEGER,
+            step INTEGER,
+            fetched_at REAL,
+            state TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS consensus_timelines (
+            height INTEGER PRIMARY KEY,
+            timeline TEXT
+        );
+    """
+
+    def __init__(self, db_path: str = 'result/consensus.db', batch_interval: float = 5.0):
+        self.db_path = db_path
+        self.batch_interval = batch_interval
+        self.pending_consensus_states = {}
+        self.last_flush = time.monotonic()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # BOTH MONITOR PROCESSES WRITE TO THE SAME DATABASE
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+        self.migrate()
+        self.connection.commit()
+        logger.info(f"Using SQLite storage: {db_path}")
+
+    def migrate(self):
+        """Adds columns introduced after a database was created."""
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(votes)")}
+        if 'source' not in columns:
+            try:
+                self.connection.execute("ALTER TABLE votes ADD COLUMN source TEXT")
+                logger.info(f"Added votes.source column [{self.db_path}]")
+            except sqlite3.OperationalError as e:
+                # WS AND FETCH PROCESSES OPEN THE SAME DATABASE, THE OTHER ONE MAY HAVE ADDED IT FIRST
+                if 'duplicate column' not in str(e):
+                    raise
+
+    def load_votes(self, height: str) -> Optional[dict]:
+        rows = self.connection.execute(
+            "SELECT round, type, validator, timestamp, hash, signature, source FROM votes WHERE height = ? ORDER BY rowid",
+            (int(height),)
+        ).fetchall()
+        if not rows:
+            return None
+
+        state = {
+            'height': str(height),
+            'rounds': {}
+        }
+        for _round, _vote_type, _validator_hex, _timestamp, _hash, _signature, _source in rows:
+            vote_types = state['rounds'].setdefault(str(_round), {'Prevote': {}, 'Precommit': {}})
+            event = {
+                'timestamp': _timestamp,
+                'hash': _hash,
+                'signature': _signature
+            }
+            if _source:
+                event['source'] = _source
+            vote_types[_vote_type].setdefault(_validator_hex, []).append(event)
+        return state
+
+    def save_votes(self, height: str, state: dict):
+        rows = [
+            (int(height), int(_round), _vote_type, _validator_hex, event['timestamp'], event['hash'], event['signature'], event.get('source'))
+            for _round, vote_types in state['rounds'].items()
+            for _vote_type, validators in vote_types.items()
+            for _validator_hex, events in validators.items()
+            for event in events
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO votes (height, round, type, validator, timestamp, hash, signature, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.debug(f"Saved #{height} votes [{self.db_path}]")
+
+    def save_signatures(self, height: str, data: dict):
+        rows = []
+        for signed, validators in ((1, data['signed_validators']), (0, data['missed_validators'])):
+            for _validator_hex, validator in validators.items():
+                signature = validator.get('signature') or {}
+                rows.append((
+                    int(height),
+                    _validator_hex,
+                    validator.get('moniker'),
+                    validator.get('valoper'),
+                    signed,
+                    signature.get('timestamp'),
+                    signature.get('signature')
+                ))
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO blocks (height, proposer, total_signed, total_missed) VALUES (?, ?, ?, ?)",
+                (int(height), data['proposer'], data['total_signed'], data['total_missed'])
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO signatures (height, validator, moniker, valoper, signed, timestamp, signature) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        logger.debug(f"Saved #{height} signatures [{self.db_path}]")
+
+    def save_consensus_state(self, height: int, _round: int, _step: int, consensus: dict):
+        self.pending_consensus_states[int(height)] = (int(height), _round, _step, time.time(), json_codec.dumps(consensus))
+        # FLUSH WHEN HEIGHT CHANGES OR BATCH INTERVAL PASSED
+        if len(self.pending_consensus_states) > 1 or time.monotonic() - self.last_flush >= self.batch_interval:
+            self.flush()
+
+    def save_timeline(self, height: int, timeline: dict):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO consensus_timelines (height, timeline) VALUES (?, ?)",
+                (int(height), json_codec.dumps(timeline))
+            )
+        logger.debug(f"Saved #{height} /consensus_state timeline [{self.db_path}]")
+
+    def flush(self):
+        """Commits buffered /consensus_state snapshots."""
+        self.last_flush = time.monotonic()
+        if not self.pending_consensus_states:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO consensus_states (height, round, step, fetched_at, state) VALUES (?, ?, ?, ?, ?)",
+                list(self.pending_consensus_states.values())
+            )
+        logger.debug(f"Saved {len(self.pending_consensus_states)} /consensus_state snapshots [{self.db_path}]")
+        self.pending_consensus_states = {}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+def create_storage(backend: Literal["json", "sqlite"], sqlite_path: str = 'result/consensus.db'):
+    if backend == 'sqlite':
+        return SqliteStorage(db_path=sqlite_path)
+    return JsonStorage()
@@ -0,0 +1,85 @@
+import time
+from typing import List, Optional
+from src.bit_array import BitArray
+
+VOTE_TYPES = ('prevotes', 'precommits')
+
+class ConsensusTimeline:
+    """
+    Delta-encoded history of /consensus_state snapshots for the current height.
+
+    Instead of keeping full dumps, only changes are stored, with milliseconds relative to the
+    first snapshot of the height:
+    {
+        'height': 814165,
+        'start_ms': 1732534949123,
+        'steps': [[0, 0, 3], [850, 0, 4], ...],                     # [ms, round, step]
+        'rounds': {
+            '0': {
+                'size': 112,
+                'prevotes': [[850, [0, 4, 7], []], [912, [1], []]],   # [ms, added indices, removed indices]
+                'precommits': [...]
+            }
+        }
+    }
+    """
+
+    def __init__(self):
+        self.timeline = None
+        self.last_bits = {}
+        self.last_step = None
+
+    def observe(self, height: int, _round: int, _step: int, consensus: dict, timestamp: Optional[float] = None) -> Optional[dict]:
+        """Records changes of a snapshot. Returns the finished timeline of the previous height once height changes."""
+        now_ms = int((timestamp or time.time()) * 1000)
+        finished = None
+
+        if not self.timeline or self.timeline['height'] != height:
+            finished = self.close()
+            self.timeline = {
+                'height': height,
+                'start_ms': now_ms,
+                'steps': [],
+                'rounds': {}
+            }
+
+        offset = now_ms - self.timeline['start_ms']
+        if (_round, _step) != self.last_step:
+            self.last_step = (_round, _step)
+            self.timeline['steps'].append([offset, _round, _step])
+
+        for round_votes in consensus['round_state']['height_vote_set']:
+            round_key = str(round_votes['round'])
+            for vote_type in VOTE_TYPES:
+                bits = BitArray.from_string(round_votes[f"{vote_type}_bit_array"])
+                previous = self.last_bits.get((round_key, vote_type)) or BitArray(len(bits))
+                if bits == previous:
+                    continue
+                self.last_bits[(round_key, vote_type)] = bits
+
+                round_timeline = self.timeline['rounds'].setdefault(round_key, {
+                    'size': len(bits),
+                    'prevotes': [],
+                    'precommits': []
+                })
+                round_timeline[vote_type].append([offset, (bits - previous).indices(), (previous - bits).indices()])
+
+        return finished
+
+    def close(self) -> Optional[dict]:
+        """Returns the current timeline and resets the state."""
+        finished = self.timeline
+        self.timeline = None
+        self.last_bits = {}
+        self.last_step = None
+        return finished
+
+def reconstruct_arrivals(timeline: dict, _round: str, vote_type: str) -> List[List[int]]:
+    """Rebuilds the vote arrival curve [[ms, votes received], ...] of a round from its deltas."""
+    curve = []
+    voted = set()
+    for offset, added, removed in timeline['rounds'].get(str(_round), {}).get(vote_type, []):
+        voted.update(added)
+        voted.difference_update(removed)
+        curve.append([offset, len(voted)])
+    return curve
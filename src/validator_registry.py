@@ -0,0 +1,197 @@
+import time
+import asyncio
+import traceback
+from typing import List, Optional
+from utils.logger import logger
+from src.calls import AioHttpCalls
+from src.converter import pubkeys_to_consensus_hex
+
+class ValidatorSnapshot:
+    """
+    Immutable view of the bonded validator set at a given registry version.
+
+    Validators are ordered by tokens desc, then consensus address, for display. This is not
+    guaranteed to be the CometBFT validator index order (voting power is tokens truncated by
+    the power reduction), so each record carries its 'index' in the CometBFT /validators order,
+    the index votes refer to. Lookups by consensus address, by its 12 character prefix
+    (/consensus_state vote strings) and by validator index.
+    """
+    __slots__ = ('version', 'updated_at', 'validators', 'by_hex', 'by_short_hex', 'by_index')
+
+    def __init__(self, version: int, updated_at: float, validators: List[dict]):
+        self.version = version
+        self.updated_at = updated_at
+        self.validators = validators
+        self.by_hex = {validator['hex']: validator for validator in validators}
+        self.by_short_hex = {validator['hex'][:12]: validator for validator in validators}
+        self.by_index = {validator['index']: validator for validator in validators if validator.get('index') is not None}
+
+    def get(self, _hex: str) -> Optional[dict]:
+        return self.by_hex.get(_hex)
+
+    def get_by_short_hex(self, short_hex: str) -> Optional[dict]:
+        return self.by_short_hex.get(short_hex)
+
+    def get_by_index(self, index: int) -> Optional[dict]:
+        return self.by_index.get(index)
+
+    def __len__(self) -> int:
+        return len(self.validators)
+
+    def __bool__(self) -> bool:
+        return bool(self.validators)
+
+class ValidatorRegistry:
+    """
+    Validator set shared by ws, fetch and dashboard components.
+
+    Only one process (the refresher) pages the staking module and derives consensus addresses.
+    It publishes versioned snapshots into a multiprocessing.Manager dict; other processes read
+    the version on each lookup and rebuild their local indexes only when it changed. Readers ask
+    for a refresh through a shared Event. Without shared state the registry refreshes itself.
+    """
+
+    def __init__(self, shared: Optional[dict] = None, refresh_event=None, refresh_interval: float = 300.0, refresh_timeout: float = 10.0, first_refresh_timeout: float = 120.0, version_check_interval: float = 1.0, log_updates: bool = True):
+        self.shared = shared
+        self.refresh_event = refresh_event
+        self.refresh_interval = refresh_interval
+        self.refresh_timeout = refresh_timeout
+        self.first_refresh_timeout = first_refresh_timeout
+        self.version_check_interval = version_check_interval
+        self.log_updates = log_updates
+        self.local = shared is None
+        self._snapshot = ValidatorSnapshot(0, 0.0, [])
+        self._version_checked_at = 0.0
+
+    @staticmethod
+    def build_validators(data: List[dict], order: List[str]) -> List[dict]:
+        """
+        Turns staking module validators into registry records, dropping entries without consensus key.
+        order is the CometBFT validator set as consensus addresses, its positions become 'index'.
+        """
+        validators = []
+        for validator in data:
+            _consensus_pub_key = validator.get('consensus_pubkey', {}).get('key')
+            if not _consensus_pub_key:
+                logger.warning(f'Skipping validator due too missing consensus_pub_key: {validator}')
+                continue
+            validators.append({
+                'moniker': validator.get('description', {}).get('moniker', 'N/A'),
+                'valoper': validator.get('operator_address', ''),
+                'consensus_pubkey': _consensus_pub_key,
+                'tokens': int(validator.get('tokens', 0))
+            })
+
+        for validator, _hex in zip(validators, pubkeys_to_consensus_hex(validator['consensus_pubkey'] for validator in validators)):
+            validator['hex'] = _hex
+
+        indexes = {_hex: index for index, _hex in enumerate(order)}
+        for validator in validators:
+            validator['index'] = indexes.get(validator['hex'])
+
+        validators.sort(key=lambda x: (-x['tokens'], x['hex']))
+        total_stake = sum(validator['tokens'] for validator in validators)
+        for validator in validators:
+            validator['vp'] = round((validator['tokens'] / total_stake) * 100, 4) if total_stake else 0.0
+        return validators
+
+    async def fetch(self) -> Optional[List[dict]]:
+        try:
+            async with AioHttpCalls() as session:
+                data = await session.get_validators(status='BOND_STATUS_BONDED')
+                order = await session.get_cometbft_validators() if data else None
+            if data and order:
+                return self.build_validators(data, order)
+        except Exception as e:
+            logger.error(f"An error occurred while updating validators: {e}")
+            traceback.print_exc()
+        return None
+
+    async def refresh(self) -> bool:
+        """
+        Fetches the validator set and publishes a new snapshot if it changed. Returns False on failure.
+        'updated_at' marks every finished refresh, 'version' only moves when the set changed.
+        """
+        validators = await self.fetch()
+        if not validators:
+            return False
+
+        updated_at = time.time()
+        if validators == self._snapshot.validators:
+            if self.shared is not None:
+                self.shared['updated_at'] = updated_at
+            if self.log_updates:
+                logger.debug(f"Validator set unchanged | Registry version: {self._snapshot.version}")
+            return True
+
+        version = self._snapshot.version + 1
+        if self.shared is not None:
+            version = self.shared.get('version', 0) + 1
+            self.shared.update({'validators': validators, 'updated_at': updated_at, 'version': version})
+        self._snapshot = ValidatorSnapshot(version, updated_at, validators)
+        if self.log_updates:
+            logger.info("------------------------------------------------------")
+            logger.info(f"Updated validators | Current active set: {len(validators)} | Registry version: {version}")
+        return True
+
+    def snapshot(self, force_check: bool = False) -> ValidatorSnapshot:
+        """
+        Returns the latest snapshot, rebuilding local indexes only when the shared version changed.
+        The shared version is read at most once per version_check_interval to keep lookups off IPC.
+        """
+        if self.shared is not None and not self.local:
+            now = time.monotonic()
+            if not force_check and now - self._version_checked_at < self.version_check_interval:
+                return self._snapshot
+            self._version_checked_at = now
+            version = self.shared.get('version', 0)
+            if version != self._snapshot.version:
+                self._snapshot = ValidatorSnapshot(version, self.shared.get('updated_at', 0.0), self.shared.get('validators', []))
+        return self._snapshot
+
+    def get(self, _hex: str) -> Optional[dict]:
+        return self.snapshot().get(_hex)
+
+    async def update(self) -> bool:
+        """
+        Makes sure a fresh validator set is available. Local registries fetch it directly,
+        shared readers ask the refresher and wait until it finished a refresh, up to
+        refresh_timeout seconds, or first_refresh_timeout while no validator set exists yet.
+        Returns False if there still is no validator set.
+        """
+        if self.local:
+            return await self.refresh()
+
+        version = self.snapshot(force_check=True).version
+        refreshed_at = self.shared.get('updated_at', 0.0)
+        self.refresh_event.set()
+        # LONGER WAIT FOR THE FIRST SNAPSHOT: PAGING THE BONDED SET OVER A SLOW RPC MAY TAKE A WHILE
+        timeout = self.refresh_timeout if version else self.first_refresh_timeout
+        if not version:
+            logger.info("Waiting for the validator registry to publish the first validator set")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            if self.shared.get('updated_at', 0.0) != refreshed_at:
+                self.snapshot(force_check=True)
+                return True
+        logger.warning(f"Validator registry was not refreshed within {timeout}s")
+        return bool(self.snapshot(force_check=True))
+
+    async def run_refresher(self):
+        """Refresher loop: refreshes on request and every refresh_interval seconds."""
+        self.local = True
+        await self.refresh()
+        next_refresh_at = time.monotonic() + self.refresh_interval
+        try:
+            while True:
+                await asyncio.sleep(0.1)
+                if not self.refresh_event.is_set() and time.monotonic() < next_refresh_at:
+                    continue
+                self.refresh_event.clear()
+                if await self.refresh():
+                    next_refresh_at = time.monotonic() + self.refresh_interval
+                else:
+                    await asyncio.sleep(1)
+        finally:
+            await AioHttpCalls.close_shared_session()
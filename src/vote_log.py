@@ -0,0 +1,163 @@
+import os
+import asyncio
+from typing import Dict
+from utils.logger import logger
+from src.storage import JsonStorage
+from src import json_codec
+
+class VoteLog:
+    """
+    Per-height vote accumulator for websocket votes.
+
+    Votes are deduplicated and indexed in memory per height. Once the NewBlock for a height
+    arrives (plus a grace period for late precommits) the index is written once through the
+    storage backend (result/<height>/ws_votes.json by default). With journal enabled each vote
+    is also appended as a single line to result/journal/<height>.ndjson, so votes survive a
+    crash; journals left behind are replayed on the next start. Journal writes are buffered and
+    flushed at most journal_flush_interval seconds after the first unflushed vote (0 flushes
+    every vote), a crash loses at most that window. Journals are removed once their height is
+    written, so startup only looks at heights that were still open.
+    """
+    JOURNAL_DIR = 'journal'
+
+    def __init__(self, storage=None, base_dir: str = 'result', journal: bool = True, journal_flush_interval: float = 1.0, flush_grace: float = 2.0):
+        self.storage = storage or JsonStorage(base_dir=base_dir)
+        self.base_dir = base_dir
+        self.journal = journal
+        self.journal_flush_interval = journal_flush_interval
+        self.journal_flush_handle = None
+        self.flush_grace = flush_grace
+        self.heights: Dict[str, dict] = {}
+
+    def get_journal_path(self, height: str) -> str:
+        return os.path.join(self.base_dir, self.JOURNAL_DIR, f"{height}.ndjson")
+
+    def recover(self):
+        """Compacts journals left by a previous run that did not shut down cleanly."""
+        journal_dir = os.path.join(self.base_dir, self.JOURNAL_DIR)
+        if not os.path.isdir(journal_dir):
+            return
+
+        for entry in os.scandir(journal_dir):
+            height, extension = os.path.splitext(entry.name)
+            if entry.is_file() and extension == '.ndjson':
+                logger.warning(f"Found unfinished votes journal for height {height}. Recovering")
+                self.open_height(height)
+                self.compact(height)
+
+    def open_height(self, height: str) -> dict:
+        if height in self.heights:
+            return self.heights[height]
+
+        entry = {
+            'state': {
+                'height': height,
+                'rounds': {}
+            },
+            'seen': set(),
+            'journal': None,
+            'flush_handle': None
+        }
+
+        # HEIGHT MIGHT HAVE BEEN SAVED ALREADY (LATE VOTE)
+        state = self.storage.load_votes(height)
+        if state:
+            for _round, vote_types in state.get('rounds', {}).items():
+                for _vote_type, validators in vote_types.items():
+                    for _validator_hex, events in validators.items():
+                        for event in events:
+                            self.index_vote(entry, _round, _vote_type, _validator_hex, event)
+            logger.debug(f"Loaded #{height} votes state")
+
+        # REPLAY JOURNAL LEFT BY A CRASH
+        journal_path = self.get_journal_path(height)
+        truncated = False
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r') as f:
+                for line in f:
+                    truncated = not line.endswith('\n')
+                    try:
+                        _round, _vote_type, _validator_hex, event = json_codec.loads(line)
+                    except (json_codec.JSONDecodeError, ValueError):
+                        logger.warning(f"Skipping truncated record in {journal_path}")
+                        continue
+                    self.index_vote(entry, _round, _vote_type, _validator_hex, event)
+
+        if self.journal:
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+            entry['journal'] = open(journal_path, 'a')
+            if truncated:
+                # TERMINATE PARTIAL RECORD SO NEW ONES START ON A CLEAN LINE
+                entry['journal'].write('\n')
+        self.heights[height] = entry
+        return entry
+
+    def index_vote(self, entry: dict, _round: str, _vote_type: str, _validator_hex: str, event: dict) -> bool:
+        key = (_round, _vote_type, _validator_hex, event['timestamp'], event['hash'], event['signature'])
+        if key in entry['seen']:
+            return False
+        entry['seen'].add(key)
+
+        rounds = entry['state']['rounds']
+        if _round not in rounds:
+            rounds[_round] = {
+                'Prevote': {},
+                'Precommit': {}
+            }
+        rounds[_round][_vote_type].setdefault(_validator_hex, []).append(event)
+        return True
+
+    def append(self, height: str, _round: str, _vote_type: str, _validator_hex: str, event: dict) -> bool:
+        """Adds a vote to the height accumulator. Returns False if the vote is already stored."""
+        entry = self.open_height(height)
+        if not self.index_vote(entry, _round, _vote_type, _validator_hex, event):
+            return False
+
+        if entry['journal']:
+            entry['journal'].write(json_codec.dumps([_round, _vote_type, _validator_hex, event]) + '\n')
+            if self.journal_flush_interval <= 0:
+                entry['journal'].flush()
+            elif self.journal_flush_handle is None:
+                self.journal_flush_handle = asyncio.get_running_loop().call_later(self.journal_flush_interval, self.flush_journals)
+        return True
+
+    def flush_journals(self):
+        """Hands buffered journal records of all open heights to the OS."""
+        self.journal_flush_handle = None
+        for entry in self.heights.values():
+            if entry['journal']:
+                entry['journal'].flush()
+
+    def compact(self, height: str):
+        """Saves the in-memory index of the height through the storage backend and drops the journal."""
+        entry = self.heights.pop(height, None)
+        if not entry:
+            return
+
+        if entry['flush_handle']:
+            entry['flush_handle'].cancel()
+        if entry['journal']:
+            entry['journal'].close()
+
+        self.storage.save_votes(height, entry['state'])
+
+        journal_path = self.get_journal_path(height)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+
+    def schedule_compaction(self, height: int):
+        """Schedules a write of every open height lower or equal to the provided one after the grace period."""
+        for _height, entry in list(self.heights.items()):
+            if int(_height) > height or entry['flush_handle']:
+                continue
+            if self.flush_grace > 0:
+                entry['flush_handle'] = asyncio.get_running_loop().call_later(self.flush_grace, self.compact, _height)
+            else:
+                self.compact(_height)
+
+    def close(self):
+        if self.journal_flush_handle:
+            self.journal_flush_handle.cancel()
+            self.journal_flush_handle = None
+        for _height in list(self.heights):
+            self.compact(_height)
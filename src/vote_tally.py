@@ -0,0 +1,112 @@
+import time
+from typing import Dict, List, Optional
+from src.bit_array import BitArray
+
+VOTE_TYPES = ('Prevote', 'Precommit')
+
+class VoteTally:
+    """
+    Voting-power-weighted prevote/precommit progress computed locally from websocket Vote events.
+
+    Keeps an indexed validator table (consensus address -> voting power, vote index learned from
+    votes) and per round and vote type: voters bitset, voted power, power per block hash and the
+    moment +2/3 of the power was crossed. Every vote is O(1), nothing is polled.
+    """
+
+    def __init__(self):
+        self.power_by_hex: Dict[str, int] = {}
+        self.index_by_hex: Dict[str, int] = {}
+        self.total_power = 0
+
+        self.height = -1
+        self.round = -1
+        self.step = ''
+        self.round_started_at: Dict[int, float] = {}
+        self.rounds: Dict[tuple, dict] = {}
+
+    def set_validators(self, validators: List[dict]):
+        """Sets validator table from [{'hex': ..., 'tokens': ...}, ...]."""
+        self.power_by_hex = {validator['hex']: int(validator['tokens']) for validator in validators}
+        self.total_power = sum(self.power_by_hex.values())
+
+    def reset(self, height: int):
+        self.height = height
+        self.round = 0
+        self.round_started_at = {}
+        self.rounds = {}
+
+    def new_round_step(self, height: int, _round: int, _step: str, timestamp: Optional[float] = None):
+        if height != self.height:
+            self.reset(height)
+        self.round = _round
+        self.step = _step
+        self.round_started_at.setdefault(_round, timestamp or time.time())
+
+    def get_round(self, _round: int, _vote_type: str) -> dict:
+        key = (_round, _vote_type)
+        if key not in self.rounds:
+            self.rounds[key] = {
+                'voters': BitArray(max(len(self.power_by_hex), 1)),
+                'power': 0,
+                'blocks': {},
+                'first_vote_at': None,
+                'crossed_at': None
+            }
+        return self.rounds[key]
+
+    def add_vote(self, height: int, _round: int, _vote_type: str, validator_index: int, validator_hex: str, block_hash: str, timestamp: Optional[float] = None) -> bool:
+        """Adds a vote to the tally. Returns False for duplicates and votes of other heights."""
+        if height > self.height:
+            self.reset(height)
+        elif height < self.height:
+            return False
+
+        now = timestamp or time.time()
+        self.index_by_hex[validator_hex] = validator_index
+        tally = self.get_round(_round, _vote_type)
+
+        voters = tally['voters']
+        if validator_index >= len(voters):
+            voters = tally['voters'] = BitArray(validator_index + 1, voters.value)
+        if validator_index in voters:
+            return False
+        voters.set(validator_index)
+
+        power = self.power_by_hex.get(validator_hex, 0)
+        tally['power'] += power
+        tally['blocks'][block_hash] = tally['blocks'].get(block_hash, 0) + power
+        if tally['first_vote_at'] is None:
+            tally['first_vote_at'] = now
+        if tally['crossed_at'] is None and self.total_power and tally['power'] * 3 > self.total_power * 2:
+            tally['crossed_at'] = now
+        return True
+
+    def has_voted(self, _round: int, _vote_type: str, validator_hex: str) -> bool:
+        index = self.index_by_hex.get(validator_hex)
+        tally = self.rounds.get((_round, _vote_type))
+        return index is not None and tally is not None and index in tally['voters']
+
+    def power_fraction(self, _round: int, _vote_type: str) -> float:
+        tally = self.rounds.get((_round, _vote_type))
+        if not tally or not self.total_power:
+            return 0.0
+        return tally['power'] / self.total_power
+
+    def block_fractions(self, _round: int, _vote_type: str) -> Dict[str, float]:
+        """Voted power fraction per block hash ('' is nil)."""
+        tally = self.rounds.get((_round, _vote_type))
+        if not tally or not self.total_power:
+            return {}
+        return {block_hash: power / self.total_power for block_hash, power in tally['blocks'].items()}
+
+    def crossing_delay(self, _round: int, _vote_type: str) -> Optional[float]:
+        """Seconds from round start (or first vote) until +2/3 voting power was reached."""
+        tally = self.rounds.get((_round, _vote_type))
+        if not tally or tally['crossed_at'] is None:
+            return None
+        started_at = self.round_started_at.get(_round, tally['first_vote_at'])
+        return tally['crossed_at'] - started_at
+
+    def online_count(self, _round: int) -> int:
+        counts = [self.rounds[(_round, _vote_type)]['voters'].count() for _vote_type in VOTE_TYPES if (_round, _vote_type) in self.rounds]
+        return max(counts, default=0)
@@ -1,24 +1,220 @@
-import json
+import time
 import websockets
 import asyncio
 import socket
-from typing import List
+from typing import Callable, List, Literal, Optional, Union
 from utils.logger import logger
+from utils.flags import flags
+from src import json_codec
 
-async def websocket_connect(ws: str, events: List, callback):
+class EventQueue:
+    """
+    Bounded queue between the websocket receiver and event processing.
+
+    The receiver only decodes and enqueues messages, worker tasks run the callback. When the queue
+    is full the policy decides: 'block' stops reading the socket until a slot frees up,
+    'drop_newest' discards the incoming message and 'drop_oldest' discards the oldest queued one.
+    Queue depth, drops, lag (time from receive to processing start) and inbound bytes per event
+    are reported periodically.
+    """
+    STATS_INTERVAL = 60.0
+    DRAIN_TIMEOUT = 2.0
+
+    def __init__(self, callback, size: int, workers: int, policy: Literal["block", "drop_newest", "drop_oldest"], deduplicator: 'EventDeduplicator' = None):
+        self.callback = callback
+        self.deduplicator = deduplicator
+        self.size = size
+        self.workers = workers
+        self.policy = policy
+        self.queue = asyncio.Queue(maxsize=size)
+        self.tasks = []
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        # EVENT -> [MESSAGES, BYTES] RECEIVED
+        self.inbound = {}
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        self.tasks.append(asyncio.create_task(self.report_stats()))
+
+    async def close(self):
+        """Gives workers DRAIN_TIMEOUT seconds to process what is queued, then stops them."""
+        if self.queue.qsize():
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=self.DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"WebSocket queue not drained on shutdown. Discarding {self.queue.qsize()} messages")
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.log_stats()
+
+    def count_inbound(self, data, size: int):
+        """Counts every received message, including duplicates dropped by the deduplicator."""
+        event = data['result']['query'].split('=')[-1].strip("'")
+        inbound = self.inbound.setdefault(event, [0, 0])
+        inbound[0] += 1
+        inbound[1] += size
+
+    async def put(self, data):
+        self.received += 1
+        item = (time.monotonic(), data)
+
+        if self.queue.full():
+            if self.policy == 'drop_newest':
+                self.dropped += 1
+                return
+            if self.policy == 'drop_oldest':
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+
+        await self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def worker(self):
+        while True:
+            received_at, data = await self.queue.get()
+            lag = time.monotonic() - received_at
+            self.lag_total += lag
+            if lag > self.lag_max:
+                self.lag_max = lag
+            try:
+                await self.callback(data)
+            except Exception as e:
+                logger.error(f"An error occurred while processing WebSocket message: {e}")
+            finally:
+                self.processed += 1
+                self.queue.task_done()
+
+    def log_stats(self):
+        avg_lag = self.lag_total / self.processed if self.processed else 0.0
+        log = logger.warning if self.dropped else logger.debug
+        log("WebSocket queue | Depth: %s/%s (max %s) | Received: %s | Processed: %s | Dropped: %s | Lag avg: %.1f ms, max: %.1f ms",
+            self.queue.qsize(), self.size, self.max_depth, self.received, self.processed, self.dropped, avg_lag * 1000, self.lag_max * 1000)
+        if self.inbound:
+            log("WebSocket inbound | %s", " | ".join(
+                f"{event}: {count} msgs, {size / 1024:.1f} KiB (avg {size / count / 1024:.1f} KiB)" for event, (count, size) in self.inbound.items()))
+        if self.deduplicator:
+            self.deduplicator.log_stats(log)
+        self.max_depth = self.queue.qsize()
+        self.lag_max = 0.0
+
+    async def report_stats(self):
+        while True:
+            await asyncio.sleep(self.STATS_INTERVAL)
+            self.log_stats()
+
+class EventDeduplicator:
+    """
+    First-arrival filter for events received from several redundant websocket endpoints.
+
+    Events are keyed by what identifies them on chain (a vote by height, round, type, validator and
+    signature, a block by height), the first copy is forwarded with data['source'] set to the
+    endpoint that delivered it and later copies are dropped. Per source it counts first arrivals,
+    duplicates and how far behind the first arrival its duplicates were.
+    """
+    CACHE_SIZE = 20000
+
+    def __init__(self, sources: List[str]):
+        self.seen = {}
+        # SOURCE -> [FIRST ARRIVALS, DUPLICATES, BEHIND TOTAL, BEHIND MAX]
+        self.stats = {source: [0, 0, 0.0, 0.0] for source in sources}
+
+    @staticmethod
+    def get_key(data: dict) -> Optional[tuple]:
+        event = data['result']['query'].split('=')[-1].strip("'")
+        value = data['result']['data']['value']
+        if event == 'Vote':
+            vote = value['Vote']
+            return (event, vote['height'], vote['round'], vote['type'], vote['validator_address'], vote['signature'])
+        if event == 'NewBlock':
+            return (event, value['block']['header']['height'])
+        if event == 'NewBlockHeader':
+            return (event, value['header']['height'])
+        if event == 'NewRoundStep':
+            return (event, value['height'], value['round'], value['step'])
+        # ValidatorSetUpdates HAS NO HEIGHT, REFRESHES IT TRIGGERS ARE DEBOUNCED DOWNSTREAM
+        return None
+
+    def first_arrival(self, source: str, data: dict) -> bool:
+        """Returns True if the event was not seen from any source yet and tags it with the source."""
+        try:
+            key = self.get_key(data)
+        except (KeyError, TypeError):
+            key = None
+
+        now = time.monotonic()
+        stats = self.stats[source]
+        if key is not None:
+            first_at = self.seen.get(key)
+            if first_at is not None:
+                behind = now - first_at
+                stats[1] += 1
+                stats[2] += behind
+                if behind > stats[3]:
+                    stats[3] = behind
+                return False
+            self.seen[key] = now
+            if len(self.seen) > self.CACHE_SIZE:
+                del self.seen[next(iter(self.seen))]
+
+        stats[0] += 1
+        data['source'] = source
+        return True
+
+    def log_stats(self, log: Callable):
+        for source, (first, duplicates, behind_total, behind_max) in self.stats.items():
+            avg_behind = behind_total / duplicates if duplicates else 0.0
+            log("WebSocket source %s | First: %s | Duplicates: %s | Behind avg: %.1f ms, max: %.1f ms",
+                source, first, duplicates, avg_behind * 1000, behind_max * 1000)
+            self.stats[source][3] = 0.0
+
+async def websocket_connect(ws: Union[str, List[str]], events: List, callback, queue_size: int = None, workers: int = None, queue_policy: str = None, decoder: Callable = None):
+    """Receives events from one endpoint or, deduplicated, from several redundant endpoints at once."""
+    sources = [ws] if isinstance(ws, str) else list(dict.fromkeys(ws))
+    deduplicator = EventDeduplicator(sources) if len(sources) > 1 else None
+    event_queue = EventQueue(
+        callback=callback,
+        size=queue_size or flags.ws_queue_size,
+        workers=workers or flags.ws_workers,
+        policy=queue_policy or flags.ws_queue_policy,
+        deduplicator=deduplicator
+    )
+    event_queue.start()
+    try:
+        await asyncio.gather(*(
+            receive_events(ws=source, events=events, event_queue=event_queue, decoder=decoder or json_codec.loads, deduplicator=deduplicator)
+            for source in sources
+        ))
+    finally:
+        await event_queue.close()
+
+async def receive_events(ws: str, events: List, event_queue: EventQueue, decoder: Callable, deduplicator: EventDeduplicator = None):
     while True:
         try:
             async with websockets.connect(ws, max_size=6250000) as websocket:
                 for event in events:
                     logger.info(f"Connecting to WebSocket: {ws.ljust(15)}. Event: {event}")
-                    await websocket.send(json.dumps(event))
+                    await websocket.send(json_codec.dumps(event))
                 
                 while True:
                     try:
-                        response = await asyncio.wait_for(websocket.recv(), timeout=60.0)
-                        data = json.loads(response)
+                        # UNDECODED FRAME: len() IS THE INBOUND SIZE IN BYTES, THE DECODERS TAKE BYTES
+                        response = await asyncio.wait_for(websocket.recv(decode=False), timeout=60.0)
+                        data = decoder(response)
                         if data.get('result') and 'query' in data['result']:
-                            await callback(data)
+                            event_queue.count_inbound(data, len(response))
+                            if deduplicator and not deduplicator.first_arrival(ws, data):
+                                continue
+                            await event_queue.put(data)
                         else:
                             if data.get('error'):
                                 logger.error(f"Unexpected message received from WebSocket {ws.ljust(15)}: {data}")
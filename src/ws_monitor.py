@@ -1,20 +1,38 @@
+import time
+import asyncio
 import traceback
-import os
-import json 
-from typing import List
+from typing import List, Literal, Union
 from utils.logger import logger
 from src.websocket import websocket_connect
+from src.partial_decoder import decode_new_block_event
 from src.calls import AioHttpCalls
-from src.converter import pubkey_to_consensus_hex
+from src.validator_registry import ValidatorRegistry
+from src.vote_log import VoteLog
+from src.storage import create_storage
 
 class WsConsensusMonitoring:
+    # UNKNOWN VOTE SENDERS: MISSES WITHIN THE DEBOUNCE WINDOW SHARE ONE REFRESH, ADDRESSES STILL
+    # UNKNOWN AFTER IT ARE NOT REFRESHED AGAIN FOR NEGATIVE_CACHE_TTL SECONDS
+    REFRESH_DEBOUNCE = 0.5
+    NEGATIVE_CACHE_TTL = 60.0
+    PENDING_VOTES_LIMIT = 1000
+    # NewBlockHeader MODE: /commit OF THE PREVIOUS HEIGHT IS FETCHED WITH A FEW RETRIES
+    COMMIT_FETCH_ATTEMPTS = 3
+    COMMIT_FETCH_RETRY_DELAY = 0.5
+
     def __init__(self,
-                 ws: str,
+                 ws: Union[str, List[str]],
                  ws_events: List[dict],
                  post_target_check_blocks: List[str],
                  target_height: str,
                  save_all: bool,
-                 no_save: bool
+                 no_save: bool,
+                 votes_journal: bool = True,
+                 votes_journal_flush_interval: float = 1.0,
+                 votes_flush_grace: float = 2.0,
+                 storage: Literal["json", "sqlite"] = 'json',
+                 sqlite_path: str = 'result/consensus.db',
+                 registry: ValidatorRegistry = None
                  ):
         self.target_height = target_height
         self.save_all = save_all
@@ -23,19 +41,42 @@ class WsConsensusMonitoring:
         self.ws_events = ws_events
         self.check_blocks_list = post_target_check_blocks
         self.ws = ws
-        self.validators = {}
+        self.registry = registry or ValidatorRegistry()
+        self.refresh_task = None
+        self.pending_votes = {}
+        self.unknown_validators = {}
+        self.commit_tasks = set()
+        self.commit_bytes = 0
+        self.commits_fetched = 0
+        self.storage = None if no_save else create_storage(backend=storage, sqlite_path=sqlite_path)
+        self.vote_log = VoteLog(storage=self.storage, journal=votes_journal, journal_flush_interval=votes_journal_flush_interval, flush_grace=votes_flush_grace)
 
     async def start(self):
 
         logger.info("------------------------------------------------------")
         logger.info("Fetching validators")
-        await self.update_validators()
+        if not self.registry.snapshot(force_check=True):
+            await self.update_validators()
 
-        if not self.validators:
+        if not self.registry.snapshot():
             logger.error("Failed to fetch validators. Exiting")
             exit(0)
 
-        await websocket_connect(ws=self.ws, events=self.ws_events, callback=self.process_new_event_callback)
+        if not self.no_save:
+            self.vote_log.recover()
+
+        try:
+            # NEWBLOCK MESSAGES ARE DECODED PARTIALLY: ONLY HEADER AND LAST COMMIT, NOT TXS OR EVIDENCE
+            await websocket_connect(ws=self.ws, events=self.ws_events, callback=self.process_new_event_callback, decoder=decode_new_block_event)
+        finally:
+            if self.refresh_task:
+                self.refresh_task.cancel()
+            for task in self.commit_tasks:
+                task.cancel()
+            self.vote_log.close()
+            if self.storage:
+                self.storage.close()
+            await AioHttpCalls.close_shared_session()
 
     async def process_new_event_callback(self, data):
         try:
@@ -43,20 +84,26 @@ class WsConsensusMonitoring:
             event = data['result']['query'].split('=')[-1].strip("'")
             
             if event == 'Vote':
-                await self.process_new_vote_entry(event_data=event_data)
+                await self.process_new_vote_entry(event_data=event_data, source=data.get('source'))
 
             elif event == 'NewRoundStep':
                 _step = event_data['step']
                 _height = event_data['height']
                 _round = event_data['round']
-                logger.debug(f"{_step.ljust(29)} | Round: {_round}   | Height: {_height}")
+                logger.debug("%-29s | Round: %s   | Height: %s", _step, _round, _height)
 
             elif event == 'ValidatorSetUpdates':
                 logger.info(f"{event} event received")
-                await self.update_validators()
+                self.schedule_validators_refresh()
 
             elif event == 'NewBlock':
                 await self.process_new_block_entry(event_data=event_data)
+
+            elif event == 'NewBlockHeader':
+                # FETCH THE COMMIT IN THE BACKGROUND, VOTES OF THE NEXT HEIGHT KEEP FLOWING
+                task = asyncio.create_task(self.process_new_block_header_entry(header=event_data['header']))
+                self.commit_tasks.add(task)
+                task.add_done_callback(self.commit_tasks.discard)
             
             else:
                 logger.error(f"Received unknown event {event}. Skipping")
@@ -65,7 +112,7 @@ class WsConsensusMonitoring:
             logger.error(f"An error occurred while parsing data {data}: {e}")
             traceback.print_exc()
 
-    async def process_new_vote_entry(self, event_data):
+    async def process_new_vote_entry(self, event_data, source: str = None):
         _height = str(event_data['Vote']['height'])
         _round = str(event_data['Vote']['round'])
         _timestamp = event_data['Vote']['timestamp']
@@ -83,60 +130,29 @@ class WsConsensusMonitoring:
             logger.error(f"Received unknown vote type number {_vote_number_type}. Skipping")
             return
         
-        # CHECK IF VALIDATOR EXISTS
-        _validator_info = self.validators.get(_validator_hex)
+        # CHECK IF VALIDATOR EXISTS. UNKNOWN SENDERS ARE PARKED UNTIL THE BACKGROUND REFRESH FINISHES
+        _validator_info = self.registry.get(_validator_hex)
         if not _validator_info:
-            await self.update_validators()
-            _validator_info = self.validators.get(_validator_hex)
-        if not _validator_info:
-            logger.error(f"Validator {_validator_hex} not found even after update")
+            self.defer_unknown_vote(_validator_hex, event_data, source)
             return
 
         if not self.no_save and (_height == self.target_height or self.save_all or _height in self.check_blocks_list):
-            file_path = f"result/{_height}/ws_votes.json"
-
-            logger.debug(f"{f'Saving {_vote_type}'.ljust(18)}{_validator_info['moniker'][:11].ljust(12)}| Round: {_round}   | Height: {_height} [{file_path}]")
-
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    try:
-                        state = json.load(f)
-                        logger.debug(f"Loaded {file_path} state")
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Failed to load {file_path} {e}")
-                        return
-            else:
-                state = {
-                    'height': _height,
-                    'rounds': {}
-                    }
-            state['height'] = _height
-            
-
-            if _round not in state['rounds']:
-                state['rounds'][_round] = {
-                    'Prevote': {},
-                    'Precommit': {}
-                }
-
             event = {
                 'timestamp': _timestamp,
                 'hash': _hash,
                 'signature': _signature
             }
-            if _validator_hex not in state['rounds'][_round][_vote_type]:
-                state['rounds'][_round][_vote_type][_validator_hex] = []
-            
-            if event not in state['rounds'][_round][_vote_type][_validator_hex]:
-                state['rounds'][_round][_vote_type][_validator_hex].append(event)
+            # WITH SEVERAL WEBSOCKET ENDPOINTS, RECORD WHICH ONE DELIVERED THE VOTE FIRST
+            if source:
+                event['source'] = source
+            if self.vote_log.append(_height, _round, _vote_type, _validator_hex, event):
+                logger.debug("Stored %-11s%-12.11s| Round: %s   | Height: %s", _vote_type, _validator_info['moniker'], _round, _height)
+            else:
+                logger.debug("Duplicate %-8s%-12.11s| Round: %s   | Height: %s", _vote_type, _validator_info['moniker'], _round, _height)
 
-            os.makedirs(f"result/{_height}", exist_ok=True)
-            with open(file_path, 'w') as f:
-                json.dump(state, f, indent=4)
-            logger.debug(f"{f'Saved {_vote_type}'.ljust(18)}{_validator_info['moniker'][:11].ljust(12)}| Round: {_round}   | Height: {_height} [{file_path}]")
-        
         else:
-            logger.debug(f"Skipping {f'{_vote_type}'.ljust(18)}{_validator_info['moniker'][:11].ljust(12)}| Round: {_round}   | Height: {str(_height).ljust(7)} | Target: {self.target_height}")
+            # HOT PATH: %-STYLE ARGUMENTS ARE ONLY FORMATTED WHEN DEBUG IS ENABLED
+            logger.debug("Skipping %-18s%-12.11s| Round: %s   | Height: %-7s | Target: %s", _vote_type, _validator_info['moniker'], _round, _height, self.target_height)
 
 
     async def process_new_block_entry(self, event_data):
@@ -157,13 +173,21 @@ class WsConsensusMonitoring:
         _signed_validators = {}
         _missed_validators = {}
 
-        for validator in self.validators:
+        # SNAPSHOT RECORDS ARE SHARED, COPY THEM BEFORE ATTACHING SIGNATURES
+        validators = self.registry.snapshot().by_hex
+        for validator, info in validators.items():
+            record = {
+                'moniker': info['moniker'],
+                'hex': info['hex'],
+                'valoper': info['valoper'],
+                'consensus_pubkey': info['consensus_pubkey']
+            }
             if validator in parsed_signatures:
-                _signed_validators[validator] = self.validators[validator]
-                _signed_validators[validator]['signature'] = parsed_signatures[validator]
+                record['signature'] = parsed_signatures[validator]
+                _signed_validators[validator] = record
             else:
-                _missed_validators[validator] = self.validators[validator]
-                _missed_validators[validator]['signature'] = None
+                record['signature'] = None
+                _missed_validators[validator] = record
 
         _total_signed = len(_signed_validators)
         _total_missed = len(_missed_validators)
@@ -177,43 +201,83 @@ class WsConsensusMonitoring:
             'missed_validators': _missed_validators,
         }
 
-        logger.info(f"{f'Finalized #{_height}'.ljust(19)}| Signatures: {f'{_total_signed}'.ljust(5)}/ {f'{len(self.validators)}'.ljust(5)}| Proposer: {_proposer} | Missing signatures: {[val['moniker'] for _,val in _missed_validators.items()]}")
+        logger.info(f"{f'Finalized #{_height}'.ljust(19)}| Signatures: {f'{_total_signed}'.ljust(5)}/ {f'{len(validators)}'.ljust(5)}| Proposer: {_proposer} | Missing signatures: {[val['moniker'] for _,val in _missed_validators.items()]}")
         
         if not self.no_save and (_height == self.target_height or self.save_all or _height in self.check_blocks_list):
-
-            file_path = f"result/{_height}/ws_signatures.json"
-            os.makedirs(f"result/{_height}", exist_ok=True)
-            if not os.path.exists(file_path):
-                with open(file_path, 'w') as f:
-                    json.dump(data, f, indent=4)
-
-                logger.debug(f"Saved #{_height} signatures")
+            self.storage.save_signatures(_height, data)
         else:
             logger.info(f"Skipping saving signatures for block #{_height}")
 
-    async def update_validators(self):
+        # BLOCK IS COMMITTED. WRITE ITS VOTES ONCE LATE PRECOMMITS HAD A CHANCE TO ARRIVE
+        self.vote_log.schedule_compaction(int(event_data['block']['header']['height']))
+
+    async def process_new_block_header_entry(self, header):
+        """Builds the NewBlock entry from the header and /commit of the previous height."""
+        try:
+            _height = int(header['height'])
+            commit = None
+            for attempt in range(self.COMMIT_FETCH_ATTEMPTS):
+                # COUNT THE /commit BODIES ONLY (EVERY ENDPOINT ATTEMPT), OTHER REQUESTS OF THIS PROCESS RUN CONCURRENTLY
+                async with AioHttpCalls() as session:
+                    commit = await session.get_commit(height=_height - 1)
+                    self.commit_bytes += session.response_bytes
+                if commit:
+                    break
+                await asyncio.sleep(self.COMMIT_FETCH_RETRY_DELAY)
+
+            self.commits_fetched += 1
+            logger.debug("Commit #%s fetched: %.1f KiB per block on average over %s blocks", _height - 1, self.commit_bytes / self.commits_fetched / 1024, self.commits_fetched)
+
+            if not commit:
+                logger.error(f"Failed to fetch commit of #{_height - 1}. Skipping signatures")
+                self.vote_log.schedule_compaction(_height)
+                return
+
+            await self.process_new_block_entry(event_data={'block': {'header': header, 'last_commit': commit}})
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred while processing NewBlockHeader {header}: {e}")
+            traceback.print_exc()
+
+    def defer_unknown_vote(self, _validator_hex: str, event_data: dict, source: str = None):
+        missed_at = self.unknown_validators.get(_validator_hex)
+        if missed_at is not None and time.monotonic() - missed_at < self.NEGATIVE_CACHE_TTL:
+            logger.debug("Skipping vote of unknown validator %s", _validator_hex)
+            return
+
+        if sum(len(votes) for votes in self.pending_votes.values()) < self.PENDING_VOTES_LIMIT:
+            self.pending_votes.setdefault(_validator_hex, []).append((event_data, source))
+        self.schedule_validators_refresh()
+
+    def schedule_validators_refresh(self):
+        """Starts a debounced background refresh unless one is already in flight."""
+        if self.refresh_task and not self.refresh_task.done():
+            return
+        self.refresh_task = asyncio.create_task(self.refresh_validators())
+
+    async def refresh_validators(self):
         try:
-            async with AioHttpCalls() as session:
-                data = await session.get_validators(status='BOND_STATUS_BONDED')
-                if data:
-                    validators = {}
-                    for validator  in data:
-                        _consensus_pub_key = validator['consensus_pubkey']['key']
-                        _moniker = validator.get('description',{}).get('moniker', 'N/A')
-                        _valoper = validator.get('operator_address', '')
-
-                        _hex = pubkey_to_consensus_hex(pub_key=_consensus_pub_key)
-                        validators[_hex] = {
-                            'moniker': _moniker,
-                            'hex': _hex,
-                            'valoper': _valoper,
-                            'consensus_pubkey': _consensus_pub_key,
-                            }
-                
-                    self.validators = validators
-                    logger.info("------------------------------------------------------")
-                    logger.info(f"Updated validators | Current active set: {len(self.validators)}")
+            await asyncio.sleep(self.REFRESH_DEBOUNCE)
+            await self.update_validators()
 
+            pending_votes, self.pending_votes = self.pending_votes, {}
+            for _validator_hex, votes in pending_votes.items():
+                if not self.registry.get(_validator_hex):
+                    self.unknown_validators[_validator_hex] = time.monotonic()
+                    logger.error(f"Validator {_validator_hex} not found even after update. Dropping {len(votes)} votes")
+                    continue
+                self.unknown_validators.pop(_validator_hex, None)
+                for event_data, source in votes:
+                    await self.process_new_vote_entry(event_data=event_data, source=source)
+
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"An error occurred while updating validators: {e}")
-            traceback.print_exc()
\ No newline at end of file
+            logger.error(f"An error occurred while refreshing validators: {e}")
+            traceback.print_exc()
+
+    async def update_validators(self):
+        """Asks the shared validator registry for a fresh validator set."""
+        await self.registry.update()
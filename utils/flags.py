@@ -20,6 +20,8 @@ def parse_args() -> Namespace:
     parser = argparse.ArgumentParser(description="Global arguments for the application", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('--log_lvl', default='INFO', type=validate_log_level, help='Set the logging level [DEBUG, INFO, WARNING, ERROR]')
     parser.add_argument('--log_path', type=str, default='logs/logs.log', help='Path to the log file')
+    parser.add_argument('--log_max_bytes', type=int, default=10485760, help='Rotate the log file once it reaches this size in bytes (0 to never rotate)')
+    parser.add_argument('--log_backup_count', type=int, default=5, help='Number of rotated log files to keep')
 
     parser.add_argument(
         '--log_save',
@@ -27,8 +29,20 @@ def parse_args() -> Namespace:
         help='To save logs', default=True
     )
 
-    parser.add_argument('--rpc', type=str, help='RPC server http/s', required=True)
-    parser.add_argument('--ws', type=str, help='Websocket endpoint', required=False)
+    parser.add_argument('--rpc', type=str, nargs='+', help='RPC server(s) http/s (required unless --archive_from is set). With several servers requests go to the fastest healthy one, ranked by latency and error rate', required=False)
+    parser.add_argument('--ws', type=str, nargs='+', help='Websocket endpoint(s). With several endpoints events are received from all of them at once and deduplicated, the first arrival wins and its source is recorded with the vote', required=False)
+    parser.add_argument('--ws_queue_size', type=int, help='Maximum number of received websocket messages waiting to be processed', required=False, default=10000)
+    parser.add_argument('--ws_workers', type=int, help='Tasks processing queued websocket messages (1 keeps event order)', required=False, default=1)
+    parser.add_argument('--ws_queue_policy', type=str, choices=['block', 'drop_newest', 'drop_oldest'], help='What to do when the websocket queue is full: stop reading the socket until there is room, or drop the incoming/oldest message', required=False, default='block')
+    parser.add_argument('--ws_block_mode', type=str, choices=['auto', 'full', 'header'], help='How the ws monitor reads block signatures: full NewBlock events, or NewBlockHeader events plus /commit of the previous height (much less inbound data on blocks with txs). auto picks header if the node serves /commit', required=False, default='auto')
+    parser.add_argument('--abci_transport', type=str, choices=['get', 'post', 'grpc'], help='Transport for ABCI queries (validators, upgrade plan): JSON-RPC abci_query over GET or POST, or the module gRPC Query services (requires --grpc and grpcio)', required=False, default='get')
+    parser.add_argument('--grpc', type=str, help='gRPC endpoint host:port used with --abci_transport grpc (https:// prefix for TLS)', required=False)
+    parser.add_argument('--rpc_hedge', action='store_true', help='With several --rpc servers, send a duplicate request to the next best server when the first one does not answer within its p95 latency. The first answer wins', required=False)
+    parser.add_argument('--rpc_hedge_delay', type=float, help='Seconds to wait before a hedged request while a server has too few samples for its p95 latency', required=False, default=1.0)
+    parser.add_argument('--rpc_pool_limit', type=int, help='Max simultaneous keep-alive connections in the shared RPC connection pool (0 for no limit)', required=False, default=100)
+    parser.add_argument('--rpc_pool_limit_per_host', type=int, help='Max simultaneous connections to a single RPC host (0 for no limit)', required=False, default=0)
+    parser.add_argument('--rpc_dns_cache_ttl', type=int, help='Seconds to cache resolved RPC host addresses', required=False, default=300)
+    parser.add_argument('--rpc_keepalive_timeout', type=float, help='Seconds to keep idle RPC connections open for reuse', required=False, default=60.0)
     parser.add_argument('--target_height', type=str, help='Block height to snapshot consensus prevotes & precommits', required=False)
     parser.add_argument('--post_target_check_blocks_num', type=str, help='How many blocks to keep snapshoting consensus prevotes & precommits after target_height is reached', required=False, default='10')
 
@@ -44,6 +58,27 @@ def parse_args() -> Namespace:
         help='Do not save any metrics (signatures, prevotes, precommits etc.)'
     )
 
+    parser.add_argument('--fetch_rate', type=float, help='Target /consensus_state polls per second when the consensus step is unknown (0 for no limit)', required=False, default=4.0)
+    parser.add_argument('--fetch_fast_rate', type=float, help='/consensus_state polls per second during prevote/precommit steps and right after step transitions (0 for no limit)', required=False, default=10.0)
+    parser.add_argument('--fetch_slow_rate', type=float, help='/consensus_state polls per second during propose/commit waits and after failed polls (0 for no limit)', required=False, default=2.0)
+    parser.add_argument('--validators_page_limit', type=int, help='Validators per staking query page', required=False, default=200)
+    parser.add_argument('--validators_page_concurrency', type=int, help='Validator pages fetched in parallel by offset (1 to follow next_key sequentially)', required=False, default=4)
+    parser.add_argument('--validators_refresh_interval', type=float, help='Seconds between periodic validator set refreshes. Validators are fetched by a single process and shared with ws and fetch monitors; unknown validators and ValidatorSetUpdates trigger an immediate refresh', required=False, default=300.0)
+    parser.add_argument('--validators_first_fetch_timeout', type=float, help='Seconds the ws and fetch monitors wait for the first validator set before exiting', required=False, default=120.0)
+
+    parser.add_argument('--storage', type=str, choices=['json', 'sqlite'], help='Storage backend for saved metrics: JSON files in result/[height]/ or a single SQLite database', required=False, default='json')
+    parser.add_argument('--sqlite_path', type=str, help='Path to the SQLite database used with --storage sqlite', required=False, default='result/consensus.db')
+
+    parser.add_argument(
+        '--no_votes_journal',
+        action='store_true',
+        help='Do not journal websocket votes to result/journal/[height].ndjson. Votes of heights not yet written to ws_votes.json are then lost on a crash'
+    )
+
+    parser.add_argument('--votes_journal_flush_interval', type=float, help='Seconds a journaled vote may stay buffered before it is flushed to disk, the most a crash can lose (0 flushes every vote)', required=False, default=1.0)
+
+    parser.add_argument('--votes_flush_grace', type=float, help='Seconds to keep collecting late votes after NewBlock before writing result/[height]/ws_votes.json', required=False, default=2.0)
+
     parser.add_argument(
         '--dashboard_only',
         action='store_true',
@@ -57,9 +92,28 @@ def parse_args() -> Namespace:
     )
     
     parser.add_argument('--dashboard_refresh_per_second', type=int, help='Refresh rate of the table', required=False, default=1)
+    parser.add_argument('--dashboard_source', type=str, choices=['rpc', 'ws'], help='Dashboard data source: poll /consensus_state every second or compute voting-power-weighted progress locally from websocket votes', required=False, default='rpc')
+
+    parser.add_argument('--archive_from', type=int, help='Compact saved result/[height]/*.json files starting from this height into columnar segments and exit', required=False)
+    parser.add_argument('--archive_to', type=int, help='Last height to compact with --archive_from, equals --archive_from if not set', required=False)
+    parser.add_argument('--archive_dir', type=str, help='Directory to write columnar segment files to', required=False, default='archive')
+    parser.add_argument('--archive_segment_size', type=int, help='Number of heights per segment file', required=False, default=1000)
 
     args = parser.parse_args()
 
+    if args.archive_from is not None:
+        if args.archive_to is None:
+            args.archive_to = args.archive_from
+        if args.archive_to < args.archive_from:
+            parser.error("Argument --archive_to cannot be lower than --archive_from.")
+        return args
+
+    if not args.rpc:
+        parser.error("Argument --rpc is required.")
+
+    if args.abci_transport == 'grpc' and not args.grpc:
+        parser.error("Argument --grpc is required with --abci_transport grpc.")
+
     if not args.dashboard_only:
         if args.no_save:
             if args.save_all or args.target_height:
@@ -1,12 +1,113 @@
 import os
+import queue
+import atexit
 import logging
 from logging.config import dictConfig
+from typing import Optional
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from utils.flags import flags
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+class MultiProcessRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler shared by the forked ws/fetch processes. Size is checked on the file on
+    disk, a process whose file was rotated by another one reopens the new file, and rollover
+    itself is serialized with a lock file.
+    """
+
+    def shouldRollover(self, record) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            on_disk = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            self.reopen()
+            return False
+        if os.fstat(self.stream.fileno()).st_ino != on_disk.st_ino:
+            self.reopen()
+        return self.maxBytes > 0 and on_disk.st_size >= self.maxBytes
+
+    def reopen(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = self._open()
+
+    def doRollover(self):
+        if fcntl is None:
+            return super().doRollover()
+        with open(f"{self.baseFilename}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # ANOTHER PROCESS MAY HAVE ROTATED WHILE WE WAITED FOR THE LOCK
+                on_disk = os.stat(self.baseFilename)
+                if os.fstat(self.stream.fileno()).st_ino == on_disk.st_ino and on_disk.st_size >= self.maxBytes:
+                    super().doRollover()
+                else:
+                    self.reopen()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+class LogPipeline:
+    """
+    Callers only put records on an in-memory queue, console and file output is written by a
+    QueueListener thread. The listener thread does not survive fork, so forked processes
+    get a fresh queue and listener.
+    """
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.default_handlers = list(handlers)
+        # PLAIN StreamHandlers WRITE TO THE TERMINAL, FILE HANDLERS SUBCLASS StreamHandler
+        self.console_handlers = [handler for handler in handlers if type(handler) is logging.StreamHandler]
+        self.queue_handler = QueueHandler(queue.SimpleQueue())
+        self.listener = None
+
+    def start(self):
+        self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def redirect_console(self, handler: Optional[logging.Handler]):
+        """
+        Replaces terminal output with handler (None drops it), file output is kept. Used while a
+        Rich Live display owns the terminal. restore_console() puts the console handlers back.
+        """
+        if handler is not None and handler.level == logging.NOTSET and self.console_handlers:
+            handler.setLevel(self.console_handlers[0].level)
+        handlers = [existing for existing in self.default_handlers if existing not in self.console_handlers]
+        self.set_handlers(handlers + [handler] if handler else handlers)
+
+    def restore_console(self):
+        self.set_handlers(list(self.default_handlers))
+
+    def set_handlers(self, handlers):
+        # QueueListener READS .handlers FOR EVERY RECORD, SWAPPING THE TUPLE IS ENOUGH
+        self.handlers = handlers
+        if self.listener:
+            self.listener.handlers = tuple(handlers)
+
+    def stop(self):
+        """Flushes queued records. Call before a subprocess exits, atexit does not run there."""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+    def restart_after_fork(self):
+        self.listener = None
+        self.queue_handler.queue = queue.SimpleQueue()
+        self.start()
+
+log_pipeline = None
+
 def set_up_logger(
     log_lvl: str,
     log_save: bool,
     log_path: str,
+    log_max_bytes: int = 0,
+    log_backup_count: int = 0,
 
 ) -> logging.Logger:
 
@@ -58,9 +159,11 @@ def set_up_logger(
 
     if log_save:
         logging_config["handlers"]["file"] = {
-            "class": "logging.FileHandler",
+            "()": MultiProcessRotatingFileHandler,
             "formatter": "file",
             "filename": log_path,
+            "maxBytes": log_max_bytes,
+            "backupCount": log_backup_count,
             "level": log_lvl.upper(),
             "encoding": "utf-8",
         }
@@ -72,14 +175,45 @@ def set_up_logger(
             os.makedirs(logs_dir)
 
     dictConfig(logging_config)
+
+    # MOVE CONSOLE/FILE I/O OFF THE CALLING THREAD: LOGGERS ONLY ENQUEUE RECORDS
+    global log_pipeline
+    root_logger = logging.getLogger()
+    websockets_logger = logging.getLogger("websockets")
+    log_pipeline = LogPipeline(handlers=list(root_logger.handlers))
+    for configured_logger in (root_logger, websockets_logger):
+        for handler in list(configured_logger.handlers):
+            configured_logger.removeHandler(handler)
+        configured_logger.addHandler(log_pipeline.queue_handler)
+    log_pipeline.start()
+    atexit.register(log_pipeline.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=log_pipeline.restart_after_fork)
+
     logger = logging.getLogger(__name__)
 
     return logger
 
+def stop_logging():
+    """Flushes and stops the log listener of the current process."""
+    if log_pipeline:
+        log_pipeline.stop()
+
+def redirect_console_logging(handler: Optional[logging.Handler]):
+    """Sends records meant for the terminal to handler (None drops them). File logging is unchanged."""
+    if log_pipeline:
+        log_pipeline.redirect_console(handler)
+
+def restore_console_logging():
+    if log_pipeline:
+        log_pipeline.restore_console()
+
 def setup_logging():
     logger = set_up_logger(log_lvl=flags.log_lvl,
                            log_save=flags.log_save,
                            log_path=flags.log_path,
+                           log_max_bytes=flags.log_max_bytes,
+                           log_backup_count=flags.log_backup_count,
                            )
     return logger
 